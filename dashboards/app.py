@@ -7,14 +7,25 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import streamlit as st
-import time
+
+import pandas as pd
+import plotly.express as px
 
 from src.storage.database import get_database
+from src.storage.repositories import TraceRepository, LLMCallRepository
 from src.metrics.cost_tracker import CostTracker
 from src.metrics.latency_tracker import LatencyTracker
 from src.metrics.error_detector import ErrorDetector
 from src.utils import format_cost, format_duration, format_tokens
 
+# Time range options, defined once at module scope
+_HOURS = {
+    "Last Hour": 1,
+    "Last 6 Hours": 6,
+    "Last 24 Hours": 24,
+    "Last 7 Days": 168,
+}
+
 # Page configuration
 st.set_page_config(
     page_title="AI Observability Dashboard",
@@ -36,6 +47,155 @@ def init_trackers():
 
 db, cost_tracker, latency_tracker, error_detector = init_trackers()
 
+
+@st.cache_resource
+def get_repos(_db):
+    """Initialize repositories once instead of rebuilding them every rerun."""
+    return TraceRepository(_db), LLMCallRepository(_db)
+
+
+trace_repo, llm_repo = get_repos(db)
+
+
+# Cached query wrappers keyed by time range.
+# `hours` only takes a handful of values (1/6/24/168), so max_entries keeps
+# the caches tiny while avoiding a fresh SQLite aggregation on every rerun.
+# The `_live` variants use a 5s TTL to match the auto-refresh cadence.
+@st.cache_data(ttl=30, max_entries=32)
+def _total_cost(hours):
+    return cost_tracker.get_total_cost(hours=hours)
+
+
+@st.cache_data(ttl=30, max_entries=32)
+def _token_usage(hours):
+    return cost_tracker.get_token_usage(hours=hours)
+
+
+@st.cache_data(ttl=30, max_entries=32)
+def _average_latency(hours):
+    return latency_tracker.get_average_latency(hours=hours)
+
+
+@st.cache_data(ttl=30, max_entries=32)
+def _error_rate(hours):
+    return error_detector.get_error_rate(hours=hours)
+
+
+@st.cache_data(ttl=30, max_entries=32)
+def _cost_by_model(hours):
+    return cost_tracker.get_cost_by_model(hours=hours)
+
+
+@st.cache_data(ttl=30, max_entries=32)
+def _latency_by_model(hours):
+    return latency_tracker.get_latency_by_model(hours=hours)
+
+
+@st.cache_data(ttl=30, max_entries=32)
+def _percentiles(hours):
+    return latency_tracker.get_percentiles(hours=hours)
+
+
+@st.cache_data(ttl=30, max_entries=32)
+def _cost_over_time(hours):
+    return cost_tracker.get_cost_over_time(hours=hours, bucket_type="hourly")
+
+
+@st.cache_data(ttl=30, max_entries=32)
+def _error_rate_over_time(hours):
+    return error_detector.get_error_rate_over_time(hours=hours, bucket_type="hourly")
+
+
+@st.cache_data(ttl=30, max_entries=32)
+def _recent_errors(limit, hours):
+    return error_detector.get_recent_errors(limit=limit, hours=hours)
+
+
+# Completed traces and LLM calls are append-only, so per-ID lookups can be
+# cached aggressively: repeated inspection of the same request across reruns
+# never re-queries the database
+@st.cache_data(ttl=600, max_entries=2048)
+def _get_trace(trace_id):
+    return trace_repo.get_trace(trace_id)
+
+
+@st.cache_data(ttl=600, max_entries=2048)
+def _get_llm_call(trace_id):
+    return llm_repo.get_llm_call(trace_id)
+
+
+@st.cache_data(ttl=5, max_entries=8)
+def _total_cost_live(hours):
+    return cost_tracker.get_total_cost(hours=hours)
+
+
+@st.cache_data(ttl=5, max_entries=8)
+def _token_usage_live(hours):
+    return cost_tracker.get_token_usage(hours=hours)
+
+
+@st.cache_data(ttl=5, max_entries=8)
+def _average_latency_live(hours):
+    return latency_tracker.get_average_latency(hours=hours)
+
+
+@st.cache_data(ttl=5, max_entries=8)
+def _error_rate_live(hours):
+    return error_detector.get_error_rate(hours=hours)
+
+
+@st.cache_data(ttl=5, max_entries=8)
+def _recent_traces_live(hours, limit=20):
+    return trace_repo.get_traces_df_by_time_range(hours=hours, limit=limit)
+
+
+def _downsample(df, max_points=500):
+    """Thin a time-series DataFrame to at most max_points rows.
+
+    Keeps SVG/WebGL rendering cheap in the browser when bucket
+    granularity produces long series.
+    """
+    if len(df) <= max_points:
+        return df
+    return df.iloc[:: len(df) // max_points]
+
+
+@st.cache_data(ttl=30, max_entries=32)
+def build_inspector_df(hours, limit):
+    """Build the Request Inspector browse table as a single DataFrame.
+
+    Pre-rendering one DataFrame replaces dozens of per-row widgets with a
+    single Arrow-serialized st.dataframe per rerun.
+    """
+    df = trace_repo.get_traces_df_by_time_range(hours=hours, limit=limit)
+    if df.empty:
+        return pd.DataFrame()
+
+    llm_calls = llm_repo.get_llm_calls_by_trace_ids(df['trace_id'].tolist())
+    df = df[df['trace_id'].isin(llm_calls)]
+    if df.empty:
+        return pd.DataFrame()
+
+    # model/total_tokens/cost_usd are denormalized onto traces; only the
+    # text bodies still need the llm_calls join (merging them again would
+    # suffix the overlapping columns)
+    calls_df = pd.DataFrame(llm_calls.values())
+    df = df.merge(
+        calls_df[['trace_id', 'prompt', 'response']],
+        on='trace_id',
+        how='left',
+    )
+    df['timestamp'] = pd.to_datetime(df['start_time'], unit='s').dt.strftime('%H:%M:%S')
+    df['duration'] = df['duration_ms'].map(format_duration, na_action='ignore').fillna('N/A')
+    df['cost'] = df['cost_usd'].fillna(0.0).map(format_cost)
+    df['prompt_preview'] = df['prompt'].fillna('N/A').str.slice(0, 500)
+    df['response_preview'] = df['response'].fillna('N/A').str.slice(0, 500)
+
+    return df[[
+        'trace_id', 'timestamp', 'name', 'model', 'status', 'duration',
+        'total_tokens', 'cost', 'prompt_preview', 'response_preview',
+    ]]
+
 # Sidebar navigation
 st.sidebar.title("📊 AI Observability")
 st.sidebar.markdown("---")
@@ -54,28 +214,26 @@ page = st.sidebar.radio(
 st.sidebar.markdown("---")
 st.sidebar.markdown("### ⚙️ Settings")
 
+# Persist the selected range in the URL so reloads and shared links land
+# on the same view and hit the cache_data wrappers directly
+_range_options = list(_HOURS)
+_default_range = st.query_params.get("range", "Last 24 Hours")
+if _default_range not in _HOURS:
+    _default_range = "Last 24 Hours"
+
 time_range = st.sidebar.selectbox(
     "Time Range",
-    ["Last Hour", "Last 6 Hours", "Last 24 Hours", "Last 7 Days"],
-    index=2,
+    _range_options,
+    index=_range_options.index(_default_range),
 )
+st.query_params["range"] = time_range
 
-# Convert time range to hours
-time_range_hours = {
-    "Last Hour": 1,
-    "Last 6 Hours": 6,
-    "Last 24 Hours": 24,
-    "Last 7 Days": 168,
-}
-hours = time_range_hours[time_range]
+hours = _HOURS[time_range]
 
-# Auto-refresh setting
+# Auto-refresh setting: consumed by the Real-time page fragment below so
+# only that panel reruns on the 5s cadence instead of the whole script
 auto_refresh = st.sidebar.checkbox("Auto-refresh (5s)", value=False)
 
-if auto_refresh:
-    time.sleep(5)
-    st.rerun()
-
 # Main content
 if page == "🏠 Overview":
     st.title("🏠 Overview Dashboard")
@@ -85,19 +243,19 @@ if page == "🏠 Overview":
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
-        total_cost = cost_tracker.get_total_cost(hours=hours)
+        total_cost = _total_cost(hours)
         st.metric("Total Cost", format_cost(total_cost))
 
     with col2:
-        token_usage = cost_tracker.get_token_usage(hours=hours)
+        token_usage = _token_usage(hours)
         st.metric("Total Tokens", format_tokens(token_usage["total_tokens"]))
 
     with col3:
-        avg_latency = latency_tracker.get_average_latency(hours=hours)
+        avg_latency = _average_latency(hours)
         st.metric("Avg Latency", format_duration(avg_latency))
 
     with col4:
-        error_rate = error_detector.get_error_rate(hours=hours)
+        error_rate = _error_rate(hours)
         st.metric("Error Rate", f"{error_rate:.2f}%")
 
     # Cost and latency charts
@@ -105,22 +263,18 @@ if page == "🏠 Overview":
 
     with col_left:
         st.subheader("💰 Cost by Model")
-        cost_by_model = cost_tracker.get_cost_by_model(hours=hours)
+        cost_by_model = _cost_by_model(hours)
         if cost_by_model:
-            import pandas as pd
             df = pd.DataFrame(cost_by_model)
-            df['total_cost'] = df['total_cost'].apply(lambda x: round(x, 4))
             st.dataframe(df, use_container_width=True)
         else:
             st.info("No data available for the selected time range.")
 
     with col_right:
         st.subheader("⚡ Latency by Model")
-        latency_by_model = latency_tracker.get_latency_by_model(hours=hours)
+        latency_by_model = _latency_by_model(hours)
         if latency_by_model:
-            import pandas as pd
             df = pd.DataFrame(latency_by_model)
-            df['avg_latency'] = df['avg_latency'].apply(lambda x: round(x, 2))
             st.dataframe(df, use_container_width=True)
         else:
             st.info("No data available for the selected time range.")
@@ -129,58 +283,48 @@ elif page == "📈 Real-time Monitoring":
     st.title("📈 Real-time Monitoring")
     st.markdown("**Refreshing every 5 seconds** (enable auto-refresh in sidebar)")
 
-    # Current metrics
-    col1, col2, col3, col4 = st.columns(4)
+    @st.fragment(run_every=5 if auto_refresh else None)
+    def realtime_panel():
+        # Current metrics
+        col1, col2, col3, col4 = st.columns(4)
 
-    with col1:
-        cost_1h = cost_tracker.get_total_cost(hours=1)
-        st.metric("Cost (1h)", format_cost(cost_1h))
+        with col1:
+            cost_1h = _total_cost_live(1)
+            st.metric("Cost (1h)", format_cost(cost_1h))
 
-    with col2:
-        tokens_1h = cost_tracker.get_token_usage(hours=1)
-        st.metric("Tokens (1h)", format_tokens(tokens_1h["total_tokens"]))
+        with col2:
+            tokens_1h = _token_usage_live(1)
+            st.metric("Tokens (1h)", format_tokens(tokens_1h["total_tokens"]))
 
-    with col3:
-        latency_1h = latency_tracker.get_average_latency(hours=1)
-        st.metric("Latency (1h)", format_duration(latency_1h))
+        with col3:
+            latency_1h = _average_latency_live(1)
+            st.metric("Latency (1h)", format_duration(latency_1h))
 
-    with col4:
-        error_rate_1h = error_detector.get_error_rate(hours=1)
-        st.metric("Errors (1h)", f"{error_rate_1h:.2f}%")
-
-    # Recent requests
-    st.subheader("📋 Recent Requests")
-    from src.storage.repositories import TraceRepository, LLMCallRepository
-    trace_repo = TraceRepository(db)
-    llm_repo = LLMCallRepository(db)
-
-    recent_traces = trace_repo.get_traces_by_time_range(hours=1)
-
-    if recent_traces:
-        import pandas as pd
-        from datetime import datetime
-
-        # Get LLM call details for each trace
-        for trace in recent_traces[:20]:  # Limit to 20 most recent
-            trace['timestamp'] = datetime.fromtimestamp(trace['start_time']).strftime('%Y-%m-%d %H:%M:%S')
-            trace['duration'] = format_duration(trace['duration_ms']) if trace['duration_ms'] else 'N/A'
-
-            # Get LLM call data if available
-            llm_call = llm_repo.get_llm_call(trace['trace_id'])
-            if llm_call:
-                trace['model'] = llm_call['model']
-                trace['tokens'] = llm_call['total_tokens']
-                trace['cost'] = format_cost(llm_call['cost_usd'])
-            else:
-                trace['model'] = 'N/A'
-                trace['tokens'] = 0
-                trace['cost'] = '$0.0000'
-
-        df = pd.DataFrame(recent_traces[:20])
-        display_columns = ['timestamp', 'name', 'model', 'status', 'duration', 'tokens', 'cost']
-        st.dataframe(df[display_columns], use_container_width=True)
-    else:
-        st.info("No recent requests in the last hour.")
+        with col4:
+            error_rate_1h = _error_rate_live(1)
+            st.metric("Errors (1h)", f"{error_rate_1h:.2f}%")
+
+        # Recent requests
+        st.subheader("📋 Recent Requests")
+        df = _recent_traces_live(1)
+
+        if not df.empty:
+            # Format column-wise (vectorized); model/total_tokens/cost_usd
+            # are denormalized onto traces, so no llm_calls join is needed
+            df = df.copy()
+            df['timestamp'] = pd.to_datetime(df['start_time'], unit='s').dt.strftime('%Y-%m-%d %H:%M:%S')
+            df['duration'] = df['duration_ms'].map(format_duration, na_action='ignore').fillna('N/A')
+
+            df['model'] = df['model'].fillna('N/A')
+            df['tokens'] = df['total_tokens'].fillna(0).astype(int)
+            df['cost'] = df['cost_usd'].fillna(0.0).map(format_cost)
+
+            display_columns = ['timestamp', 'name', 'model', 'status', 'duration', 'tokens', 'cost']
+            st.dataframe(df[display_columns], use_container_width=True)
+        else:
+            st.info("No recent requests in the last hour.")
+
+    realtime_panel()
 
 elif page == "📉 Historical Analytics":
     st.title("📉 Historical Analytics")
@@ -188,7 +332,7 @@ elif page == "📉 Historical Analytics":
 
     # Percentiles
     st.subheader("⏱️ Latency Percentiles")
-    percentiles = latency_tracker.get_percentiles(hours=hours)
+    percentiles = _percentiles(hours)
     col1, col2, col3 = st.columns(3)
     with col1:
         st.metric("P50", format_duration(percentiles['p50']))
@@ -201,36 +345,32 @@ elif page == "📉 Historical Analytics":
     st.subheader("📊 Trends Over Time")
 
     # Cost over time
-    cost_over_time = cost_tracker.get_cost_over_time(hours=hours, bucket_type="hourly")
+    cost_over_time = _cost_over_time(hours)
     if cost_over_time:
-        import pandas as pd
-        import plotly.express as px
-
-        df_cost = pd.DataFrame(cost_over_time)
+        df_cost = _downsample(pd.DataFrame(cost_over_time))
         fig_cost = px.line(
             df_cost,
             x='time_bucket',
             y='total_cost',
             title='Cost Over Time',
             labels={'total_cost': 'Cost (USD)', 'time_bucket': 'Time'},
+            render_mode='webgl',
         )
         st.plotly_chart(fig_cost, use_container_width=True)
     else:
         st.info("No cost data available for the selected time range.")
 
     # Error rate over time
-    error_over_time = error_detector.get_error_rate_over_time(hours=hours, bucket_type="hourly")
+    error_over_time = _error_rate_over_time(hours)
     if error_over_time:
-        import pandas as pd
-        import plotly.express as px
-
-        df_errors = pd.DataFrame(error_over_time)
+        df_errors = _downsample(pd.DataFrame(error_over_time))
         fig_errors = px.line(
             df_errors,
             x='time_bucket',
             y='error_rate',
             title='Error Rate Over Time',
             labels={'error_rate': 'Error Rate (%)', 'time_bucket': 'Time'},
+            render_mode='webgl',
         )
         st.plotly_chart(fig_errors, use_container_width=True)
     else:
@@ -242,20 +382,26 @@ elif page == "🔍 Request Inspector":
     # Search functionality
     search_term = st.text_input("🔎 Search prompts/responses", placeholder="Enter search term...")
 
-    from src.storage.repositories import TraceRepository, LLMCallRepository
-    trace_repo = TraceRepository(db)
-    llm_repo = LLMCallRepository(db)
-
     if search_term:
-        # Full-text search
-        results = llm_repo.search_llm_calls(search_term, limit=50)
+        # Full-text search; materialize the lazy iterator since the UI
+        # needs the match count up front and renders every row anyway
+        results = list(llm_repo.search_llm_calls(search_term, limit=50))
 
         if results:
             st.success(f"Found {len(results)} matching requests")
 
             for llm_call in results:
+                # FTS rows carry prompt_snippet/response_snippet match
+                # extracts; the LIKE fallback returns the full columns
+                if 'prompt_snippet' in llm_call.keys():
+                    prompt_text = llm_call['prompt_snippet']
+                    response_text = llm_call['response_snippet']
+                else:
+                    prompt_text = llm_call['prompt']
+                    response_text = llm_call['response']
+
                 with st.expander(f"📝 {llm_call['model']} - {llm_call['trace_id'][:8]}..."):
-                    trace = trace_repo.get_trace(llm_call['trace_id'])
+                    trace = _get_trace(llm_call['trace_id'])
 
                     col1, col2, col3, col4 = st.columns(4)
                     with col1:
@@ -269,41 +415,45 @@ elif page == "🔍 Request Inspector":
                             st.metric("Duration", format_duration(trace['duration_ms']) if trace['duration_ms'] else 'N/A')
 
                     st.markdown("**Prompt:**")
-                    st.code(llm_call['prompt'] if llm_call['prompt'] else 'N/A', language="text")
+                    st.code(prompt_text if prompt_text else 'N/A', language="text")
 
                     st.markdown("**Response:**")
-                    st.code(llm_call['response'] if llm_call['response'] else 'N/A', language="text")
+                    st.code(response_text if response_text else 'N/A', language="text")
         else:
             st.warning("No results found.")
     else:
         # Show recent requests
         st.info("Enter a search term to search through prompts and responses, or browse recent requests below.")
 
-        recent_traces = trace_repo.get_traces_by_time_range(hours=hours)
+        df = build_inspector_df(hours, 10)
 
-        if recent_traces:
-            for trace in recent_traces[:10]:
-                llm_call = llm_repo.get_llm_call(trace['trace_id'])
+        if not df.empty:
+            st.dataframe(
+                df.drop(columns=['trace_id']),
+                use_container_width=True,
+                column_config={
+                    "prompt_preview": st.column_config.TextColumn(width="large"),
+                    "response_preview": st.column_config.TextColumn(width="large"),
+                },
+            )
 
-                if llm_call:
-                    with st.expander(f"📝 {llm_call['model']} - {trace['name']} - {trace['status']}"):
-                        from datetime import datetime
-
-                        col1, col2, col3, col4 = st.columns(4)
-                        with col1:
-                            st.metric("Timestamp", datetime.fromtimestamp(trace['start_time']).strftime('%H:%M:%S'))
-                        with col2:
-                            st.metric("Tokens", llm_call['total_tokens'])
-                        with col3:
-                            st.metric("Cost", format_cost(llm_call['cost_usd']))
-                        with col4:
-                            st.metric("Duration", format_duration(trace['duration_ms']) if trace['duration_ms'] else 'N/A')
+            # Full prompt/response detail, loaded on demand for one request
+            selected_trace_id = st.selectbox(
+                "Inspect request",
+                df['trace_id'],
+                format_func=lambda trace_id: f"{trace_id[:8]}...",
+            )
+
+            if selected_trace_id:
+                llm_call = _get_llm_call(selected_trace_id)
 
+                if llm_call:
+                    with st.expander("📝 Request detail", expanded=True):
                         st.markdown("**Prompt:**")
-                        st.code(llm_call['prompt'][:500] if llm_call['prompt'] else 'N/A', language="text")
+                        st.code(llm_call['prompt'] if llm_call['prompt'] else 'N/A', language="text")
 
                         st.markdown("**Response:**")
-                        st.code(llm_call['response'][:500] if llm_call['response'] else 'N/A', language="text")
+                        st.code(llm_call['response'] if llm_call['response'] else 'N/A', language="text")
         else:
             st.info("No requests found for the selected time range.")
 
@@ -318,32 +468,27 @@ elif page == "🚨 Alerts":
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        cost_24h = cost_tracker.get_total_cost(hours=24)
+        cost_24h = _total_cost(24)
         st.metric("Cost (24h)", format_cost(cost_24h))
         st.caption("Threshold: $10/day")
 
     with col2:
-        error_rate_24h = error_detector.get_error_rate(hours=24)
+        error_rate_24h = _error_rate(24)
         st.metric("Error Rate (24h)", f"{error_rate_24h:.2f}%")
         st.caption("Threshold: 5%")
 
     with col3:
-        percentiles_24h = latency_tracker.get_percentiles(hours=24)
+        percentiles_24h = _percentiles(24)
         st.metric("P95 Latency (24h)", format_duration(percentiles_24h['p95']))
         st.caption("Threshold: 5000ms")
 
     # Recent errors
     st.subheader("🔴 Recent Errors")
-    recent_errors = error_detector.get_recent_errors(limit=10, hours=hours)
+    recent_errors = _recent_errors(10, hours)
 
     if recent_errors:
-        import pandas as pd
-        from datetime import datetime
-
-        for error in recent_errors:
-            error['timestamp'] = datetime.fromtimestamp(error['start_time']).strftime('%Y-%m-%d %H:%M:%S')
-
         df = pd.DataFrame(recent_errors)
+        df['timestamp'] = pd.to_datetime(df['start_time'], unit='s').dt.strftime('%Y-%m-%d %H:%M:%S')
         display_cols = ['timestamp', 'trace_type', 'name', 'error_message']
         st.dataframe(df[display_cols], use_container_width=True)
     else:
@@ -9,6 +9,10 @@ from pathlib import Path
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+import ast
+import functools
+import operator
+
 from langchain_groq import ChatGroq
 from langchain.agents import AgentExecutor, create_react_agent
 from langchain.tools import Tool
@@ -19,14 +23,52 @@ def search_tool(query: str) -> str:
     """Simple mock search tool."""
     return f"Search results for: {query} - Mock result about AI and machine learning"
 
+# Supported arithmetic operators for the calculator tool
+_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+    ast.Mod: operator.mod,
+}
+
+def _eval_node(node):
+    """Recursively evaluate an arithmetic AST node."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPS:
+        return _OPS[type(node.op)](_eval_node(node.left), _eval_node(node.right))
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.UAdd, ast.USub)):
+        value = _eval_node(node.operand)
+        return -value if isinstance(node.op, ast.USub) else value
+    raise ValueError(f"Unsupported expression: {ast.dump(node)}")
+
+@functools.lru_cache(maxsize=256)
+def _evaluate(expression: str):
+    """Parse and evaluate an arithmetic expression, memoized per expression."""
+    return _eval_node(ast.parse(expression, mode="eval").body)
+
 def calculator_tool(expression: str) -> str:
-    """Simple calculator tool."""
+    """Simple calculator tool using a safe AST evaluator instead of eval()."""
     try:
-        result = eval(expression)
+        result = _evaluate(expression)
         return f"Result: {result}"
     except Exception as e:
         return f"Error: {str(e)}"
 
+@functools.lru_cache(maxsize=1)
+def _get_react_prompt():
+    """Fetch the ReAct prompt once per process instead of per run."""
+    try:
+        return hub.pull("hwchase17/react")
+    except Exception:
+        # Fallback to a simple prompt if hub is unavailable
+        from langchain.prompts import PromptTemplate
+        return PromptTemplate.from_template(
+            "Answer the following question: {input}\nYou have access to: {tools}"
+        )
+
 def main():
     """Run an agent with observability."""
 
@@ -62,14 +104,7 @@ def main():
     ]
 
     # Get the ReAct prompt from LangChain hub (or use a simple one)
-    try:
-        prompt = hub.pull("hwchase17/react")
-    except:
-        # Fallback to a simple prompt if hub is unavailable
-        from langchain.prompts import PromptTemplate
-        prompt = PromptTemplate.from_template(
-            "Answer the following question: {input}\nYou have access to: {tools}"
-        )
+    prompt = _get_react_prompt()
 
     # Create agent
     agent = create_react_agent(llm, tools, prompt)
@@ -72,6 +72,17 @@ DEFAULT_PRICING = {
     "output": 0.10,
 }
 
+# Per-token pricing precomputed once at import so the hot path is a single
+# dict lookup and two multiplications per call
+_PRICING_PER_TOKEN = {
+    model: (pricing["input"] / 1_000_000, pricing["output"] / 1_000_000)
+    for model, pricing in GROQ_PRICING.items()
+}
+_DEFAULT_PER_TOKEN = (
+    DEFAULT_PRICING["input"] / 1_000_000,
+    DEFAULT_PRICING["output"] / 1_000_000,
+)
+
 
 def calculate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
     """
@@ -85,16 +96,46 @@ def calculate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
     Returns:
         Cost in USD
     """
-    pricing = GROQ_PRICING.get(model, DEFAULT_PRICING)
-    input_cost = (input_tokens / 1_000_000) * pricing["input"]
-    output_cost = (output_tokens / 1_000_000) * pricing["output"]
-    return input_cost + output_cost
+    input_rate, output_rate = _PRICING_PER_TOKEN.get(model, _DEFAULT_PER_TOKEN)
+    return input_tokens * input_rate + output_tokens * output_rate
+
+
+def calculate_cost_array(models, input_tokens, output_tokens):
+    """
+    Calculate costs for many calls at once using NumPy.
+
+    Useful when aggregating historical traces, where per-call Python
+    overhead would dominate.
+
+    Args:
+        models: Array-like of model names
+        input_tokens: Array-like of input token counts
+        output_tokens: Array-like of output token counts
+
+    Returns:
+        NumPy array of costs in USD
+    """
+    import numpy as np
+
+    input_rates = np.array(
+        [_PRICING_PER_TOKEN.get(m, _DEFAULT_PER_TOKEN)[0] for m in models]
+    )
+    output_rates = np.array(
+        [_PRICING_PER_TOKEN.get(m, _DEFAULT_PER_TOKEN)[1] for m in models]
+    )
+    return (
+        np.asarray(input_tokens) * input_rates
+        + np.asarray(output_tokens) * output_rates
+    )
 
 
 # Observability Settings
 ENABLE_PROMPT_LOGGING = os.getenv("ENABLE_PROMPT_LOGGING", "true").lower() == "true"
 ENABLE_RESPONSE_LOGGING = os.getenv("ENABLE_RESPONSE_LOGGING", "true").lower() == "true"
 ENABLE_ALERTS = os.getenv("ENABLE_ALERTS", "true").lower() == "true"
+# Event rows (chain/tool start-end, agent actions) are skippable as a
+# unit for deployments that only want traces and metrics
+ENABLE_EVENT_LOGGING = os.getenv("ENABLE_EVENT_LOGGING", "true").lower() == "true"
 
 # Data Retention
 DATA_RETENTION_DAYS = int(os.getenv("DATA_RETENTION_DAYS", "30"))
@@ -114,9 +155,15 @@ DEFAULT_ALERT_THRESHOLDS = {
 }
 
 # SQLite Configuration
+# page_size comes first: it only takes effect on a fresh database, before
+# the journal mode is set and any tables are created
 SQLITE_PRAGMAS = {
+    "page_size": 8192,  # Larger pages for scan-heavy dashboard queries
     "journal_mode": "WAL",  # Write-Ahead Logging for better concurrency
-    "cache_size": -64000,  # 64MB cache
+    "cache_size": -262144,  # 256MB cache, sized for repeated analytics scans
     "foreign_keys": 1,  # Enable foreign key constraints
     "synchronous": "NORMAL",  # Balance between safety and performance
+    "mmap_size": 268435456,  # 256MB memory-mapped I/O for read-heavy queries
+    "temp_store": "MEMORY",  # Keep sort/GROUP BY temp tables in memory
+    "busy_timeout": 5000,  # Wait up to 5s for locks instead of failing
 }
@@ -4,15 +4,34 @@ from typing import Dict, List, Optional, Any
 import time
 
 from ..storage.database import get_database, Database
-from ..utils import format_time_bucket, safe_divide
+from ..utils import format_time_bucket, resolve_time_window, safe_divide, ttl_cache
 
 
 class CostTracker:
-    """Track and analyze API costs."""
+    """Track and analyze API costs.
+
+    Hour-window queries are answered from the metrics_rollup table, which
+    the ingestion callback maintains incrementally: one row per
+    (hour, model, status) instead of a scan over raw llm_calls. Explicit
+    start/end timestamps still hit the raw tables for exact boundaries.
+    """
 
     def __init__(self, db: Optional[Database] = None):
         self.db = db or get_database()
 
+    def _rollup_start_bucket(self, hours: int) -> str:
+        """Get the hourly rollup bucket covering the start of a window.
+
+        Args:
+            hours: Number of hours back from now
+
+        Returns:
+            Hourly time bucket string (buckets sort lexicographically
+            in time order)
+        """
+        return format_time_bucket(time.time() - (hours * 3600), "hourly")
+
+    @ttl_cache(ttl=60)
     def get_total_cost(
         self,
         start_time: Optional[float] = None,
@@ -33,38 +52,58 @@ class CostTracker:
         Returns:
             Total cost in USD
         """
-        if hours:
-            end_time = time.time()
-            start_time = end_time - (hours * 3600)
+        if not session_id and start_time is None and end_time is None:
+            # Answer from the rollup: one row per hour/model vs a raw scan.
+            # With no window at all this is the maintained running total,
+            # so the all-time sum never touches raw rows either
+            query = """
+                SELECT COALESCE(SUM(sum_cost), 0) as total_cost
+                FROM metrics_rollup
+                WHERE status = 'success'
+            """
+            params = []
+
+            if hours:
+                query += " AND time_bucket_hour >= ?"
+                params.append(self._rollup_start_bucket(hours))
+
+            if model:
+                query += " AND model = ?"
+                params.append(model)
+
+            results = self.db.execute_query(query, tuple(params))
+            return results[0]["total_cost"] if results else 0.0
+
+        start_time, end_time = resolve_time_window(start_time, end_time, hours)
 
         query = """
-            SELECT COALESCE(SUM(llm_calls.cost_usd), 0) as total_cost
-            FROM llm_calls
-            JOIN traces ON llm_calls.trace_id = traces.trace_id
-            WHERE 1=1
+            SELECT COALESCE(SUM(cost_usd), 0) as total_cost
+            FROM traces
+            WHERE model IS NOT NULL
         """
 
         params = []
 
         if start_time:
-            query += " AND traces.start_time >= ?"
+            query += " AND start_time >= ?"
             params.append(start_time)
 
         if end_time:
-            query += " AND traces.start_time <= ?"
+            query += " AND start_time <= ?"
             params.append(end_time)
 
         if model:
-            query += " AND llm_calls.model = ?"
+            query += " AND model = ?"
             params.append(model)
 
         if session_id:
-            query += " AND traces.session_id = ?"
+            query += " AND session_id = ?"
             params.append(session_id)
 
         results = self.db.execute_query(query, tuple(params))
         return results[0]["total_cost"] if results else 0.0
 
+    @ttl_cache(ttl=60)
     def get_cost_by_model(
         self,
         start_time: Optional[float] = None,
@@ -82,34 +121,44 @@ class CostTracker:
             List of dictionaries with model, total_cost, total_requests, total_tokens
         """
         if hours:
-            end_time = time.time()
-            start_time = end_time - (hours * 3600)
+            query = """
+                SELECT
+                    model,
+                    ROUND(COALESCE(SUM(sum_cost), 0), 4) as total_cost,
+                    SUM(request_count) as total_requests,
+                    COALESCE(SUM(sum_tokens), 0) as total_tokens
+                FROM metrics_rollup
+                WHERE status = 'success' AND time_bucket_hour >= ?
+                GROUP BY model
+                ORDER BY total_cost DESC
+            """
+            return self.db.execute_query(query, (self._rollup_start_bucket(hours),))
 
         query = """
             SELECT
-                llm_calls.model,
-                COALESCE(SUM(llm_calls.cost_usd), 0) as total_cost,
+                model,
+                ROUND(COALESCE(SUM(cost_usd), 0), 4) as total_cost,
                 COUNT(*) as total_requests,
-                COALESCE(SUM(llm_calls.total_tokens), 0) as total_tokens
-            FROM llm_calls
-            JOIN traces ON llm_calls.trace_id = traces.trace_id
-            WHERE 1=1
+                COALESCE(SUM(total_tokens), 0) as total_tokens
+            FROM traces
+            WHERE model IS NOT NULL
         """
 
         params = []
 
         if start_time:
-            query += " AND traces.start_time >= ?"
+            query += " AND start_time >= ?"
             params.append(start_time)
 
         if end_time:
-            query += " AND traces.start_time <= ?"
+            query += " AND start_time <= ?"
             params.append(end_time)
 
-        query += " GROUP BY llm_calls.model ORDER BY total_cost DESC"
+        query += " GROUP BY model ORDER BY total_cost DESC"
 
         return self.db.execute_query(query, tuple(params))
 
+    @ttl_cache(ttl=60)
     def get_cost_by_session(
         self,
         start_time: Optional[float] = None,
@@ -127,33 +176,45 @@ class CostTracker:
             List of dictionaries with session_id, total_cost, total_requests
         """
         if hours:
-            end_time = time.time()
-            start_time = end_time - (hours * 3600)
+            # One maintained row per session; only sessions active in the
+            # window are returned, without grouping the traces table
+            query = """
+                SELECT
+                    session_id,
+                    total_cost,
+                    total_requests
+                FROM session_rollup
+                WHERE last_seen >= ?
+                ORDER BY total_cost DESC
+            """
+            return self.db.execute_query(query, (time.time() - (hours * 3600),))
+
+        start_time, end_time = resolve_time_window(start_time, end_time, hours)
 
         query = """
             SELECT
-                traces.session_id,
-                COALESCE(SUM(llm_calls.cost_usd), 0) as total_cost,
+                session_id,
+                COALESCE(SUM(cost_usd), 0) as total_cost,
                 COUNT(*) as total_requests
-            FROM llm_calls
-            JOIN traces ON llm_calls.trace_id = traces.trace_id
-            WHERE traces.session_id IS NOT NULL
+            FROM traces
+            WHERE session_id IS NOT NULL AND model IS NOT NULL
         """
 
         params = []
 
         if start_time:
-            query += " AND traces.start_time >= ?"
+            query += " AND start_time >= ?"
             params.append(start_time)
 
         if end_time:
-            query += " AND traces.start_time <= ?"
+            query += " AND start_time <= ?"
             params.append(end_time)
 
-        query += " GROUP BY traces.session_id ORDER BY total_cost DESC"
+        query += " GROUP BY session_id ORDER BY total_cost DESC"
 
         return self.db.execute_query(query, tuple(params))
 
+    @ttl_cache(ttl=60)
     def get_cost_over_time(
         self,
         start_time: Optional[float] = None,
@@ -173,36 +234,64 @@ class CostTracker:
             List of dictionaries with time_bucket, total_cost, total_requests
         """
         if hours:
-            end_time = time.time()
-            start_time = end_time - (hours * 3600)
-
-        # Use aggregated metrics table for better performance
-        bucket_format = "%Y-%m-%d-%H" if bucket_type == "hourly" else "%Y-%m-%d"
+            # Hourly rollup rows answer both granularities: daily buckets
+            # aggregate 24 hourly rows instead of re-scanning raw calls
+            bucket_expr = (
+                "time_bucket_hour"
+                if bucket_type == "hourly"
+                else "substr(time_bucket_hour, 1, 10)"
+            )
+            query = f"""
+                SELECT
+                    {bucket_expr} as time_bucket,
+                    COALESCE(SUM(sum_cost), 0) as total_cost,
+                    SUM(request_count) as total_requests
+                FROM metrics_rollup
+                WHERE status = 'success' AND time_bucket_hour >= ?
+                GROUP BY time_bucket
+                ORDER BY time_bucket ASC
+            """
+            return self.db.execute_query(query, (self._rollup_start_bucket(hours),))
+
+        # Group on integer bucket ids (one division per row) and format
+        # the handful of bucket labels in Python, instead of running
+        # strftime over every raw row. Labels come from format_time_bucket
+        # so rollup- and raw-path buckets carry identical local-time labels
+        bucket_seconds = 3600 if bucket_type == "hourly" else 86400
 
-        query = f"""
+        query = """
             SELECT
-                strftime('{bucket_format}', datetime(traces.start_time, 'unixepoch')) as time_bucket,
-                COALESCE(SUM(llm_calls.cost_usd), 0) as total_cost,
+                CAST(start_time / ? AS INTEGER) as bucket_id,
+                COALESCE(SUM(cost_usd), 0) as total_cost,
                 COUNT(*) as total_requests
-            FROM llm_calls
-            JOIN traces ON llm_calls.trace_id = traces.trace_id
-            WHERE 1=1
+            FROM traces
+            WHERE model IS NOT NULL
         """
 
-        params = []
+        params = [bucket_seconds]
 
         if start_time:
-            query += " AND traces.start_time >= ?"
+            query += " AND start_time >= ?"
             params.append(start_time)
 
         if end_time:
-            query += " AND traces.start_time <= ?"
+            query += " AND start_time <= ?"
             params.append(end_time)
 
-        query += " GROUP BY time_bucket ORDER BY time_bucket ASC"
+        query += " GROUP BY bucket_id ORDER BY bucket_id ASC"
 
-        return self.db.execute_query(query, tuple(params))
+        return [
+            {
+                "time_bucket": format_time_bucket(
+                    row["bucket_id"] * bucket_seconds, bucket_type
+                ),
+                "total_cost": row["total_cost"],
+                "total_requests": row["total_requests"],
+            }
+            for row in self.db.execute_query(query, tuple(params))
+        ]
 
+    @ttl_cache(ttl=60)
     def get_token_usage(
         self,
         start_time: Optional[float] = None,
@@ -222,36 +311,52 @@ class CostTracker:
             Dictionary with input_tokens, output_tokens, total_tokens
         """
         if hours:
-            end_time = time.time()
-            start_time = end_time - (hours * 3600)
+            query = """
+                SELECT
+                    COALESCE(SUM(sum_input_tokens), 0) as input_tokens,
+                    COALESCE(SUM(sum_output_tokens), 0) as output_tokens,
+                    COALESCE(SUM(sum_tokens), 0) as total_tokens
+                FROM metrics_rollup
+                WHERE status = 'success' AND time_bucket_hour >= ?
+            """
+            params = [self._rollup_start_bucket(hours)]
+
+            if model:
+                query += " AND model = ?"
+                params.append(model)
+
+            results = self.db.execute_query(query, tuple(params))
+            if results:
+                return results[0]
+            return {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
 
         query = """
             SELECT
-                COALESCE(SUM(llm_calls.input_tokens), 0) as input_tokens,
-                COALESCE(SUM(llm_calls.output_tokens), 0) as output_tokens,
-                COALESCE(SUM(llm_calls.total_tokens), 0) as total_tokens
-            FROM llm_calls
-            JOIN traces ON llm_calls.trace_id = traces.trace_id
-            WHERE 1=1
+                COALESCE(SUM(input_tokens), 0) as input_tokens,
+                COALESCE(SUM(output_tokens), 0) as output_tokens,
+                COALESCE(SUM(total_tokens), 0) as total_tokens
+            FROM traces
+            WHERE model IS NOT NULL
         """
 
         params = []
 
         if start_time:
-            query += " AND traces.start_time >= ?"
+            query += " AND start_time >= ?"
             params.append(start_time)
 
         if end_time:
-            query += " AND traces.start_time <= ?"
+            query += " AND start_time <= ?"
             params.append(end_time)
 
         if model:
-            query += " AND llm_calls.model = ?"
+            query += " AND model = ?"
             params.append(model)
 
         results = self.db.execute_query(query, tuple(params))
         return results[0] if results else {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
 
+    @ttl_cache(ttl=60)
     def get_cost_per_request(
         self,
         start_time: Optional[float] = None,
@@ -270,31 +375,28 @@ class CostTracker:
         Returns:
             Average cost per request in USD
         """
-        if hours:
-            end_time = time.time()
-            start_time = end_time - (hours * 3600)
+        start_time, end_time = resolve_time_window(start_time, end_time, hours)
 
         query = """
             SELECT
-                COALESCE(SUM(llm_calls.cost_usd), 0) as total_cost,
+                COALESCE(SUM(cost_usd), 0) as total_cost,
                 COUNT(*) as total_requests
-            FROM llm_calls
-            JOIN traces ON llm_calls.trace_id = traces.trace_id
-            WHERE 1=1
+            FROM traces
+            WHERE model IS NOT NULL
         """
 
         params = []
 
         if start_time:
-            query += " AND traces.start_time >= ?"
+            query += " AND start_time >= ?"
             params.append(start_time)
 
         if end_time:
-            query += " AND traces.start_time <= ?"
+            query += " AND start_time <= ?"
             params.append(end_time)
 
         if model:
-            query += " AND llm_calls.model = ?"
+            query += " AND model = ?"
             params.append(model)
 
         results = self.db.execute_query(query, tuple(params))
@@ -303,6 +405,7 @@ class CostTracker:
             return safe_divide(results[0]["total_cost"], results[0]["total_requests"])
         return 0.0
 
+    @ttl_cache(ttl=60)
     def get_most_expensive_requests(
         self,
         limit: int = 10,
@@ -321,34 +424,31 @@ class CostTracker:
         Returns:
             List of expensive request dictionaries
         """
-        if hours:
-            end_time = time.time()
-            start_time = end_time - (hours * 3600)
+        start_time, end_time = resolve_time_window(start_time, end_time, hours)
 
         query = """
             SELECT
-                traces.trace_id,
-                traces.name,
-                traces.start_time,
-                llm_calls.model,
-                llm_calls.total_tokens,
-                llm_calls.cost_usd
-            FROM llm_calls
-            JOIN traces ON llm_calls.trace_id = traces.trace_id
-            WHERE 1=1
+                trace_id,
+                name,
+                start_time,
+                model,
+                total_tokens,
+                cost_usd
+            FROM traces
+            WHERE model IS NOT NULL
         """
 
         params = []
 
         if start_time:
-            query += " AND traces.start_time >= ?"
+            query += " AND start_time >= ?"
             params.append(start_time)
 
         if end_time:
-            query += " AND traces.start_time <= ?"
+            query += " AND start_time <= ?"
             params.append(end_time)
 
-        query += " ORDER BY llm_calls.cost_usd DESC LIMIT ?"
+        query += " ORDER BY cost_usd DESC LIMIT ?"
         params.append(limit)
 
         return self.db.execute_query(query, tuple(params))
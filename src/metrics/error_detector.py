@@ -1,11 +1,18 @@
 """Error detection and analysis module."""
 
 from typing import Dict, List, Optional, Any
+import json
 import time
 from collections import Counter
 
 from ..storage.database import get_database, Database
-from ..utils import safe_divide
+from ..utils import (
+    compile_query,
+    format_time_bucket,
+    resolve_time_window,
+    safe_divide,
+    ttl_cache,
+)
 
 
 class ErrorDetector:
@@ -14,6 +21,7 @@ class ErrorDetector:
     def __init__(self, db: Optional[Database] = None):
         self.db = db or get_database()
 
+    @ttl_cache(ttl=60)
     def get_error_rate(
         self,
         start_time: Optional[float] = None,
@@ -32,32 +40,32 @@ class ErrorDetector:
         Returns:
             Error rate as a percentage (0-100)
         """
-        if hours:
-            end_time = time.time()
-            start_time = end_time - (hours * 3600)
+        start_time, end_time = resolve_time_window(start_time, end_time, hours)
 
-        query = """
+        base = """
             SELECT
                 COUNT(*) as total_requests,
-                SUM(CASE WHEN status = 'error' THEN 1 ELSE 0 END) as error_count
+                SUM(status = 'error') as error_count
             FROM traces
             WHERE 1=1
         """
 
+        clauses = []
         params = []
 
         if start_time:
-            query += " AND start_time >= ?"
+            clauses.append(" AND start_time >= ?")
             params.append(start_time)
 
         if end_time:
-            query += " AND start_time <= ?"
+            clauses.append(" AND start_time <= ?")
             params.append(end_time)
 
         if trace_type:
-            query += " AND trace_type = ?"
+            clauses.append(" AND trace_type = ?")
             params.append(trace_type)
 
+        query = compile_query(base, *clauses)
         results = self.db.execute_query(query, tuple(params))
 
         if results and results[0]["total_requests"] > 0:
@@ -66,6 +74,7 @@ class ErrorDetector:
             return (error_count / total_requests) * 100
         return 0.0
 
+    @ttl_cache(ttl=60)
     def get_error_count(
         self,
         start_time: Optional[float] = None,
@@ -84,33 +93,34 @@ class ErrorDetector:
         Returns:
             Number of errors
         """
-        if hours:
-            end_time = time.time()
-            start_time = end_time - (hours * 3600)
+        start_time, end_time = resolve_time_window(start_time, end_time, hours)
 
-        query = """
+        base = """
             SELECT COUNT(*) as error_count
             FROM traces
             WHERE status = 'error'
         """
 
+        clauses = []
         params = []
 
         if start_time:
-            query += " AND start_time >= ?"
+            clauses.append(" AND start_time >= ?")
             params.append(start_time)
 
         if end_time:
-            query += " AND start_time <= ?"
+            clauses.append(" AND start_time <= ?")
             params.append(end_time)
 
         if trace_type:
-            query += " AND trace_type = ?"
+            clauses.append(" AND trace_type = ?")
             params.append(trace_type)
 
+        query = compile_query(base, *clauses)
         results = self.db.execute_query(query, tuple(params))
         return results[0]["error_count"] if results else 0
 
+    @ttl_cache(ttl=60)
     def get_errors_by_type(
         self,
         start_time: Optional[float] = None,
@@ -127,15 +137,16 @@ class ErrorDetector:
         Returns:
             List of dictionaries with trace_type, error_count, total_count, error_rate
         """
-        if hours:
-            end_time = time.time()
-            start_time = end_time - (hours * 3600)
+        start_time, end_time = resolve_time_window(start_time, end_time, hours)
 
+        # error_rate is computed in SQL; COUNT(*) per group is always >= 1
+        # so no zero-guard is needed
         query = """
             SELECT
                 trace_type,
                 COUNT(*) as total_count,
-                SUM(CASE WHEN status = 'error' THEN 1 ELSE 0 END) as error_count
+                SUM(status = 'error') as error_count,
+                100.0 * SUM(status = 'error') / COUNT(*) as error_rate
             FROM traces
             WHERE 1=1
         """
@@ -152,16 +163,9 @@ class ErrorDetector:
 
         query += " GROUP BY trace_type ORDER BY error_count DESC"
 
-        results = self.db.execute_query(query, tuple(params))
-
-        # Calculate error rate for each type
-        for result in results:
-            result["error_rate"] = safe_divide(
-                result["error_count"], result["total_count"]
-            ) * 100
-
-        return results
+        return self.db.execute_query(query, tuple(params))
 
+    @ttl_cache(ttl=60)
     def get_recent_errors(
         self,
         limit: int = 50,
@@ -180,11 +184,9 @@ class ErrorDetector:
         Returns:
             List of error dictionaries
         """
-        if hours:
-            end_time = time.time()
-            start_time = end_time - (hours * 3600)
+        start_time, end_time = resolve_time_window(start_time, end_time, hours)
 
-        query = """
+        base = """
             SELECT
                 trace_id,
                 trace_type,
@@ -196,27 +198,32 @@ class ErrorDetector:
             WHERE status = 'error'
         """
 
+        clauses = []
         params = []
 
         if start_time:
-            query += " AND start_time >= ?"
+            clauses.append(" AND start_time >= ?")
             params.append(start_time)
 
         if end_time:
-            query += " AND start_time <= ?"
+            clauses.append(" AND start_time <= ?")
             params.append(end_time)
 
-        query += " ORDER BY start_time DESC LIMIT ?"
+        clauses.append(" ORDER BY start_time DESC LIMIT ?")
         params.append(limit)
 
+        query = compile_query(base, *clauses)
+
         return self.db.execute_query(query, tuple(params))
 
+    @ttl_cache(ttl=60)
     def get_error_patterns(
         self,
         start_time: Optional[float] = None,
         end_time: Optional[float] = None,
         hours: Optional[int] = None,
         min_occurrences: int = 2,
+        limit: int = 50,
     ) -> List[Dict[str, Any]]:
         """Get common error patterns.
 
@@ -225,13 +232,12 @@ class ErrorDetector:
             end_time: End timestamp (optional)
             hours: Number of hours back from now (optional)
             min_occurrences: Minimum number of occurrences to include
+            limit: Maximum number of patterns to return
 
         Returns:
             List of dictionaries with error_message, count
         """
-        if hours:
-            end_time = time.time()
-            start_time = end_time - (hours * 3600)
+        start_time, end_time = resolve_time_window(start_time, end_time, hours)
 
         query = """
             SELECT
@@ -251,11 +257,12 @@ class ErrorDetector:
             query += " AND start_time <= ?"
             params.append(end_time)
 
-        query += " GROUP BY error_message HAVING count >= ? ORDER BY count DESC"
-        params.append(min_occurrences)
+        query += " GROUP BY error_message HAVING count >= ? ORDER BY count DESC LIMIT ?"
+        params.extend([min_occurrences, limit])
 
         return self.db.execute_query(query, tuple(params))
 
+    @ttl_cache(ttl=60)
     def get_error_rate_over_time(
         self,
         start_time: Optional[float] = None,
@@ -274,22 +281,25 @@ class ErrorDetector:
         Returns:
             List of dictionaries with time_bucket, total_count, error_count, error_rate
         """
-        if hours:
-            end_time = time.time()
-            start_time = end_time - (hours * 3600)
+        start_time, end_time = resolve_time_window(start_time, end_time, hours)
 
-        bucket_format = "%Y-%m-%d-%H" if bucket_type == "hourly" else "%Y-%m-%d"
+        # Group on integer bucket ids (one division per row) and format
+        # the handful of bucket labels in Python, instead of running
+        # strftime over every raw row. Labels come from format_time_bucket
+        # so rollup- and raw-path buckets carry identical local-time labels
+        bucket_seconds = 3600 if bucket_type == "hourly" else 86400
 
-        query = f"""
+        query = """
             SELECT
-                strftime('{bucket_format}', datetime(start_time, 'unixepoch')) as time_bucket,
+                CAST(start_time / ? AS INTEGER) as bucket_id,
                 COUNT(*) as total_count,
-                SUM(CASE WHEN status = 'error' THEN 1 ELSE 0 END) as error_count
+                SUM(status = 'error') as error_count,
+                100.0 * SUM(status = 'error') / COUNT(*) as error_rate
             FROM traces
             WHERE 1=1
         """
 
-        params = []
+        params = [bucket_seconds]
 
         if start_time:
             query += " AND start_time >= ?"
@@ -299,18 +309,21 @@ class ErrorDetector:
             query += " AND start_time <= ?"
             params.append(end_time)
 
-        query += " GROUP BY time_bucket ORDER BY time_bucket ASC"
-
-        results = self.db.execute_query(query, tuple(params))
-
-        # Calculate error rate for each time bucket
-        for result in results:
-            result["error_rate"] = safe_divide(
-                result["error_count"], result["total_count"]
-            ) * 100
-
-        return results
-
+        query += " GROUP BY bucket_id ORDER BY bucket_id ASC"
+
+        return [
+            {
+                "time_bucket": format_time_bucket(
+                    row["bucket_id"] * bucket_seconds, bucket_type
+                ),
+                "total_count": row["total_count"],
+                "error_count": row["error_count"],
+                "error_rate": row["error_rate"],
+            }
+            for row in self.db.execute_query(query, tuple(params))
+        ]
+
+    @ttl_cache(ttl=60)
     def detect_anomalies(
         self,
         hours: int = 24,
@@ -325,33 +338,43 @@ class ErrorDetector:
         Returns:
             List of anomalous time periods
         """
-        error_rates = self.get_error_rate_over_time(hours=hours, bucket_type="hourly")
-
-        if len(error_rates) < 3:
-            return []
-
-        # Calculate mean and standard deviation
-        rates = [r["error_rate"] for r in error_rates]
-        mean_rate = sum(rates) / len(rates)
-
-        variance = sum((r - mean_rate) ** 2 for r in rates) / len(rates)
-        std_dev = variance ** 0.5
+        start_time = time.time() - (hours * 3600)
 
-        threshold = mean_rate + (threshold_multiplier * std_dev)
-
-        # Find anomalies
-        anomalies = []
-        for result in error_rates:
-            if result["error_rate"] > threshold:
-                anomalies.append({
-                    "time_bucket": result["time_bucket"],
-                    "error_rate": result["error_rate"],
-                    "threshold": threshold,
-                    "deviation": result["error_rate"] - mean_rate,
-                })
+        # Mean/stddev and the threshold comparison all run inside SQLite
+        # (algebraic variance: E[x^2] - E[x]^2), so no per-bucket Python
+        # loop or intermediate list is needed
+        query = """
+            WITH buckets AS (
+                SELECT
+                    strftime('%Y-%m-%d-%H', datetime(start_time, 'unixepoch', 'localtime')) as time_bucket,
+                    CAST(SUM(status = 'error') AS REAL) * 100 / COUNT(*) as error_rate
+                FROM traces
+                WHERE start_time >= ?
+                GROUP BY time_bucket
+            ),
+            stats AS (
+                SELECT
+                    COUNT(*) as n,
+                    AVG(error_rate) as mean_rate,
+                    SQRT(MAX(AVG(error_rate * error_rate)
+                             - AVG(error_rate) * AVG(error_rate), 0)) as std_dev
+                FROM buckets
+            )
+            SELECT
+                b.time_bucket,
+                b.error_rate,
+                s.mean_rate + ? * s.std_dev as threshold,
+                b.error_rate - s.mean_rate as deviation
+            FROM buckets b, stats s
+            WHERE s.n >= 3 AND b.error_rate > s.mean_rate + ? * s.std_dev
+            ORDER BY b.time_bucket ASC
+        """
 
-        return anomalies
+        return self.db.execute_query(
+            query, (start_time, threshold_multiplier, threshold_multiplier)
+        )
 
+    @ttl_cache(ttl=60)
     def get_errors_by_model(
         self,
         start_time: Optional[float] = None,
@@ -368,15 +391,14 @@ class ErrorDetector:
         Returns:
             List of dictionaries with model, error_count, total_count, error_rate
         """
-        if hours:
-            end_time = time.time()
-            start_time = end_time - (hours * 3600)
+        start_time, end_time = resolve_time_window(start_time, end_time, hours)
 
         query = """
             SELECT
                 llm_calls.model,
                 COUNT(*) as total_count,
-                SUM(CASE WHEN traces.status = 'error' THEN 1 ELSE 0 END) as error_count
+                SUM(traces.status = 'error') as error_count,
+                100.0 * SUM(traces.status = 'error') / COUNT(*) as error_rate
             FROM traces
             JOIN llm_calls ON traces.trace_id = llm_calls.trace_id
             WHERE 1=1
@@ -394,16 +416,9 @@ class ErrorDetector:
 
         query += " GROUP BY llm_calls.model ORDER BY error_count DESC"
 
-        results = self.db.execute_query(query, tuple(params))
-
-        # Calculate error rate for each model
-        for result in results:
-            result["error_rate"] = safe_divide(
-                result["error_count"], result["total_count"]
-            ) * 100
-
-        return results
+        return self.db.execute_query(query, tuple(params))
 
+    @ttl_cache(ttl=60)
     def get_error_summary(
         self,
         start_time: Optional[float] = None,
@@ -420,16 +435,72 @@ class ErrorDetector:
         Returns:
             Dictionary with error statistics
         """
-        error_rate = self.get_error_rate(start_time, end_time, hours)
-        error_count = self.get_error_count(start_time, end_time, hours)
-        errors_by_type = self.get_errors_by_type(start_time, end_time, hours)
-        recent_errors = self.get_recent_errors(limit=10, start_time=start_time, end_time=end_time, hours=hours)
-        error_patterns = self.get_error_patterns(start_time, end_time, hours)
+        start_time, end_time = resolve_time_window(start_time, end_time, hours)
+
+        # One statement instead of five: the CTE filters traces once and
+        # each summary section reads from it, with the list-shaped results
+        # collapsed into JSON columns parsed back in Python
+        query = """
+            WITH filtered AS (
+                SELECT trace_id, trace_type, name, start_time,
+                       duration_ms, status, error_message
+                FROM traces
+                WHERE start_time >= COALESCE(?, 0)
+                  AND start_time <= COALESCE(?, 1e18)
+            )
+            SELECT
+                (SELECT COALESCE(CAST(SUM(status = 'error') AS REAL) * 100 / COUNT(*), 0)
+                 FROM filtered) as error_rate,
+                (SELECT COUNT(*) FROM filtered WHERE status = 'error') as error_count,
+                (SELECT json_group_array(json_object(
+                    'trace_type', trace_type,
+                    'total_count', total_count,
+                    'error_count', error_count))
+                 FROM (SELECT trace_type, COUNT(*) as total_count,
+                              SUM(status = 'error') as error_count
+                       FROM filtered GROUP BY trace_type
+                       ORDER BY error_count DESC)) as errors_by_type,
+                (SELECT json_group_array(json_object(
+                    'trace_id', trace_id,
+                    'trace_type', trace_type,
+                    'name', name,
+                    'start_time', start_time,
+                    'duration_ms', duration_ms,
+                    'error_message', error_message))
+                 FROM (SELECT * FROM filtered WHERE status = 'error'
+                       ORDER BY start_time DESC LIMIT 10)) as recent_errors,
+                (SELECT json_group_array(json_object(
+                    'error_message', error_message,
+                    'count', count))
+                 FROM (SELECT error_message, COUNT(*) as count
+                       FROM filtered
+                       WHERE status = 'error' AND error_message IS NOT NULL
+                       GROUP BY error_message HAVING count >= 2
+                       ORDER BY count DESC LIMIT 50)) as common_patterns
+        """
+
+        results = self.db.execute_query(query, (start_time, end_time))
+
+        if not results:
+            return {
+                "error_rate": 0.0,
+                "error_count": 0,
+                "errors_by_type": [],
+                "recent_errors": [],
+                "common_patterns": [],
+            }
+
+        row = results[0]
+        errors_by_type = json.loads(row["errors_by_type"] or "[]")
+        for entry in errors_by_type:
+            entry["error_rate"] = safe_divide(
+                entry["error_count"], entry["total_count"]
+            ) * 100
 
         return {
-            "error_rate": error_rate,
-            "error_count": error_count,
+            "error_rate": row["error_rate"],
+            "error_count": row["error_count"],
             "errors_by_type": errors_by_type,
-            "recent_errors": recent_errors,
-            "common_patterns": error_patterns,
+            "recent_errors": json.loads(row["recent_errors"] or "[]"),
+            "common_patterns": json.loads(row["common_patterns"] or "[]"),
         }
@@ -1,18 +1,42 @@
 """Latency tracking and analytics module."""
 
 from typing import Dict, List, Optional, Any
+import json
 import time
 
 from ..storage.database import get_database, Database
-from ..utils import safe_divide
+from ..utils import format_time_bucket, resolve_time_window, safe_divide, ttl_cache
 
 
 class LatencyTracker:
-    """Track and analyze latency metrics."""
+    """Track and analyze latency metrics.
+
+    Hour-window queries are answered from the write-time rollups
+    (latency_rollup for per-trace-type latency, metrics_rollup for
+    per-model latency), reading one row per hour bucket instead of
+    scanning raw traces. Explicit start/end timestamps still hit the
+    raw tables for exact boundaries.
+    """
+
+    # Maximum number of durations sampled for percentile estimation
+    PERCENTILE_SAMPLE_SIZE = 50000
 
     def __init__(self, db: Optional[Database] = None):
         self.db = db or get_database()
 
+    def _rollup_start_bucket(self, hours: int) -> str:
+        """Get the hourly rollup bucket covering the start of a window.
+
+        Args:
+            hours: Number of hours back from now
+
+        Returns:
+            Hourly time bucket string (buckets sort lexicographically
+            in time order)
+        """
+        return format_time_bucket(time.time() - (hours * 3600), "hourly")
+
+    @ttl_cache(ttl=60)
     def get_average_latency(
         self,
         start_time: Optional[float] = None,
@@ -33,9 +57,24 @@ class LatencyTracker:
         Returns:
             Average latency in milliseconds
         """
-        if hours:
-            end_time = time.time()
-            start_time = end_time - (hours * 3600)
+        if hours and not model:
+            query = """
+                SELECT SUM(sum_latency_ms) / SUM(request_count) as avg_latency
+                FROM latency_rollup
+                WHERE time_bucket_hour >= ?
+            """
+            params = [self._rollup_start_bucket(hours)]
+
+            if trace_type:
+                query += " AND trace_type = ?"
+                params.append(trace_type)
+
+            results = self.db.execute_query(query, tuple(params))
+            if results and results[0]["avg_latency"] is not None:
+                return results[0]["avg_latency"]
+            return 0.0
+
+        start_time, end_time = resolve_time_window(start_time, end_time, hours)
 
         query = """
             SELECT AVG(traces.duration_ms) as avg_latency
@@ -68,6 +107,7 @@ class LatencyTracker:
         results = self.db.execute_query(query, tuple(params))
         return results[0]["avg_latency"] if results and results[0]["avg_latency"] else 0.0
 
+    @ttl_cache(ttl=60)
     def get_percentiles(
         self,
         start_time: Optional[float] = None,
@@ -88,11 +128,9 @@ class LatencyTracker:
         Returns:
             Dictionary with p50, p95, p99 latencies in milliseconds
         """
-        if hours:
-            end_time = time.time()
-            start_time = end_time - (hours * 3600)
+        start_time, end_time = resolve_time_window(start_time, end_time, hours)
 
-        query = """
+        sample_query = """
             SELECT traces.duration_ms
             FROM traces
         """
@@ -113,41 +151,56 @@ class LatencyTracker:
             params.append(trace_type)
 
         if model:
-            query += " JOIN llm_calls ON traces.trace_id = llm_calls.trace_id"
+            sample_query += " JOIN llm_calls ON traces.trace_id = llm_calls.trace_id"
             conditions.append("llm_calls.model = ?")
             params.append(model)
 
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
+        sample_query += " WHERE " + " AND ".join(conditions)
 
-        query += " ORDER BY traces.duration_ms ASC"
+        # Bound the sample so percentile cost stays flat as the table grows;
+        # 50k durations is more than enough resolution for p99
+        sample_query += " LIMIT ?"
+        params.append(self.PERCENTILE_SAMPLE_SIZE)
+
+        # Rank the sample with a window function and linearly interpolate
+        # each percentile in SQL: three scalars cross the sqlite3 boundary
+        # instead of every duration row
+        def _interp(fraction: float) -> str:
+            rank = f"{fraction} * n1"
+            lo = f"CAST({rank} AS INTEGER)"
+            return f"""SUM(CASE
+                WHEN rn0 = {lo} THEN duration_ms * (1 - ({rank} - {lo}))
+                WHEN rn0 = {lo} + 1 THEN duration_ms * ({rank} - {lo})
+                ELSE 0 END)"""
+
+        query = f"""
+            WITH sample AS ({sample_query}),
+            ranked AS (
+                SELECT
+                    duration_ms,
+                    ROW_NUMBER() OVER (ORDER BY duration_ms) - 1 as rn0,
+                    COUNT(*) OVER () - 1 as n1
+                FROM sample
+            )
+            SELECT
+                {_interp(0.50)} as p50,
+                {_interp(0.95)} as p95,
+                {_interp(0.99)} as p99
+            FROM ranked
+        """
 
         results = self.db.execute_query(query, tuple(params))
 
-        if not results:
+        if not results or results[0]["p50"] is None:
             return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
 
-        durations = [r["duration_ms"] for r in results]
-        n = len(durations)
-
-        def percentile(data, p):
-            if not data:
-                return 0.0
-            k = (len(data) - 1) * p
-            f = int(k)
-            c = int(k) + 1
-            if c >= len(data):
-                return data[f]
-            d0 = data[f]
-            d1 = data[c]
-            return d0 + (d1 - d0) * (k - f)
-
         return {
-            "p50": percentile(durations, 0.50),
-            "p95": percentile(durations, 0.95),
-            "p99": percentile(durations, 0.99),
+            "p50": float(results[0]["p50"]),
+            "p95": float(results[0]["p95"]),
+            "p99": float(results[0]["p99"]),
         }
 
+    @ttl_cache(ttl=60)
     def get_latency_by_trace_type(
         self,
         start_time: Optional[float] = None,
@@ -165,8 +218,21 @@ class LatencyTracker:
             List of dictionaries with trace_type, avg_latency, min_latency, max_latency, count
         """
         if hours:
-            end_time = time.time()
-            start_time = end_time - (hours * 3600)
+            query = """
+                SELECT
+                    trace_type,
+                    SUM(sum_latency_ms) / SUM(request_count) as avg_latency,
+                    MIN(min_latency_ms) as min_latency,
+                    MAX(max_latency_ms) as max_latency,
+                    SUM(request_count) as count
+                FROM latency_rollup
+                WHERE time_bucket_hour >= ?
+                GROUP BY trace_type
+                ORDER BY avg_latency DESC
+            """
+            return self.db.execute_query(query, (self._rollup_start_bucket(hours),))
+
+        start_time, end_time = resolve_time_window(start_time, end_time, hours)
 
         query = """
             SELECT
@@ -193,6 +259,7 @@ class LatencyTracker:
 
         return self.db.execute_query(query, tuple(params))
 
+    @ttl_cache(ttl=60)
     def get_latency_by_model(
         self,
         start_time: Optional[float] = None,
@@ -210,13 +277,24 @@ class LatencyTracker:
             List of dictionaries with model, avg_latency, count
         """
         if hours:
-            end_time = time.time()
-            start_time = end_time - (hours * 3600)
+            query = """
+                SELECT
+                    model,
+                    ROUND(SUM(sum_latency_ms) / SUM(request_count), 2) as avg_latency,
+                    SUM(request_count) as count
+                FROM metrics_rollup
+                WHERE status = 'success' AND time_bucket_hour >= ?
+                GROUP BY model
+                ORDER BY avg_latency DESC
+            """
+            return self.db.execute_query(query, (self._rollup_start_bucket(hours),))
+
+        start_time, end_time = resolve_time_window(start_time, end_time, hours)
 
         query = """
             SELECT
                 llm_calls.model,
-                AVG(traces.duration_ms) as avg_latency,
+                ROUND(AVG(traces.duration_ms), 2) as avg_latency,
                 COUNT(*) as count
             FROM traces
             JOIN llm_calls ON traces.trace_id = llm_calls.trace_id
@@ -237,6 +315,7 @@ class LatencyTracker:
 
         return self.db.execute_query(query, tuple(params))
 
+    @ttl_cache(ttl=60)
     def get_latency_over_time(
         self,
         start_time: Optional[float] = None,
@@ -256,14 +335,32 @@ class LatencyTracker:
             List of dictionaries with time_bucket, avg_latency, count
         """
         if hours:
-            end_time = time.time()
-            start_time = end_time - (hours * 3600)
+            # Hourly rollup rows answer both granularities: daily buckets
+            # aggregate 24 hourly rows instead of re-scanning raw traces
+            bucket_expr = (
+                "time_bucket_hour"
+                if bucket_type == "hourly"
+                else "substr(time_bucket_hour, 1, 10)"
+            )
+            query = f"""
+                SELECT
+                    {bucket_expr} as time_bucket,
+                    SUM(sum_latency_ms) / SUM(request_count) as avg_latency,
+                    SUM(request_count) as count
+                FROM latency_rollup
+                WHERE time_bucket_hour >= ?
+                GROUP BY time_bucket
+                ORDER BY time_bucket ASC
+            """
+            return self.db.execute_query(query, (self._rollup_start_bucket(hours),))
+
+        start_time, end_time = resolve_time_window(start_time, end_time, hours)
 
         bucket_format = "%Y-%m-%d-%H" if bucket_type == "hourly" else "%Y-%m-%d"
 
         query = f"""
             SELECT
-                strftime('{bucket_format}', datetime(start_time, 'unixepoch')) as time_bucket,
+                strftime('{bucket_format}', datetime(start_time, 'unixepoch', 'localtime')) as time_bucket,
                 AVG(duration_ms) as avg_latency,
                 COUNT(*) as count
             FROM traces
@@ -284,6 +381,83 @@ class LatencyTracker:
 
         return self.db.execute_query(query, tuple(params))
 
+    @ttl_cache(ttl=60)
+    def get_dashboard_snapshot(self, hours: int = 1) -> Dict[str, Any]:
+        """Get the latency panels of the dashboard in one round trip.
+
+        The average, per-trace-type and per-model sections come from the
+        rollup tables in a single statement, with the list-shaped results
+        collapsed into JSON columns parsed back in Python (the same
+        pattern as ErrorDetector.get_error_summary); percentiles come
+        from the bounded-sample statement.
+
+        Args:
+            hours: Number of hours back from now
+
+        Returns:
+            Dictionary with avg_latency, percentiles, by_trace_type,
+            by_model
+        """
+        query = """
+            WITH lr AS (
+                SELECT trace_type, request_count, sum_latency_ms,
+                       min_latency_ms, max_latency_ms
+                FROM latency_rollup
+                WHERE time_bucket_hour >= ?
+            ),
+            mr AS (
+                SELECT model, request_count, sum_latency_ms
+                FROM metrics_rollup
+                WHERE status = 'success' AND time_bucket_hour >= ?
+            )
+            SELECT
+                (SELECT SUM(sum_latency_ms) / SUM(request_count) FROM lr)
+                    as avg_latency,
+                (SELECT json_group_array(json_object(
+                        'trace_type', trace_type,
+                        'avg_latency', avg_latency,
+                        'min_latency', min_latency,
+                        'max_latency', max_latency,
+                        'count', count))
+                 FROM (
+                    SELECT
+                        trace_type,
+                        SUM(sum_latency_ms) / SUM(request_count) as avg_latency,
+                        MIN(min_latency_ms) as min_latency,
+                        MAX(max_latency_ms) as max_latency,
+                        SUM(request_count) as count
+                    FROM lr
+                    GROUP BY trace_type
+                    ORDER BY avg_latency DESC
+                 )) as by_trace_type,
+                (SELECT json_group_array(json_object(
+                        'model', model,
+                        'avg_latency', avg_latency,
+                        'count', count))
+                 FROM (
+                    SELECT
+                        model,
+                        ROUND(SUM(sum_latency_ms) / SUM(request_count), 2)
+                            as avg_latency,
+                        SUM(request_count) as count
+                    FROM mr
+                    GROUP BY model
+                    ORDER BY avg_latency DESC
+                 )) as by_model
+        """
+
+        start_bucket = self._rollup_start_bucket(hours)
+        results = self.db.execute_query(query, (start_bucket, start_bucket))
+        row = results[0] if results else {}
+
+        return {
+            "avg_latency": row.get("avg_latency") or 0.0,
+            "percentiles": self.get_percentiles(hours=hours),
+            "by_trace_type": json.loads(row.get("by_trace_type") or "[]"),
+            "by_model": json.loads(row.get("by_model") or "[]"),
+        }
+
+    @ttl_cache(ttl=60)
     def get_slowest_requests(
         self,
         limit: int = 10,
@@ -302,9 +476,7 @@ class LatencyTracker:
         Returns:
             List of slow request dictionaries
         """
-        if hours:
-            end_time = time.time()
-            start_time = end_time - (hours * 3600)
+        start_time, end_time = resolve_time_window(start_time, end_time, hours)
 
         query = """
             SELECT
@@ -332,6 +504,7 @@ class LatencyTracker:
 
         return self.db.execute_query(query, tuple(params))
 
+    @ttl_cache(ttl=60)
     def get_latency_distribution(
         self,
         start_time: Optional[float] = None,
@@ -350,67 +523,61 @@ class LatencyTracker:
         Returns:
             List of dictionaries with bucket_min, bucket_max, count
         """
-        if hours:
-            end_time = time.time()
-            start_time = end_time - (hours * 3600)
+        start_time, end_time = resolve_time_window(start_time, end_time, hours)
 
-        # First, get min and max latencies
-        query_minmax = """
-            SELECT
-                MIN(duration_ms) as min_latency,
-                MAX(duration_ms) as max_latency
-            FROM traces
-            WHERE duration_ms IS NOT NULL
-        """
-
-        params = []
+        conditions = "duration_ms IS NOT NULL"
+        range_params = []
 
         if start_time:
-            query_minmax += " AND start_time >= ?"
-            params.append(start_time)
+            conditions += " AND start_time >= ?"
+            range_params.append(start_time)
 
         if end_time:
-            query_minmax += " AND start_time <= ?"
-            params.append(end_time)
+            conditions += " AND start_time <= ?"
+            range_params.append(end_time)
 
-        results = self.db.execute_query(query_minmax, tuple(params))
+        # One pass instead of num_buckets + 1 queries: the CTE computes
+        # min/max, the outer query maps each duration to a bucket index
+        # and groups. NULLIF guards the degenerate all-equal case, where
+        # every row lands in bucket 0
+        query = f"""
+            WITH mm AS (
+                SELECT
+                    MIN(duration_ms) as min_latency,
+                    MAX(duration_ms) as max_latency
+                FROM traces
+                WHERE {conditions}
+            )
+            SELECT
+                COALESCE(MIN(
+                    ? - 1,
+                    CAST((traces.duration_ms - mm.min_latency) * ?
+                         / NULLIF(mm.max_latency - mm.min_latency, 0) AS INTEGER)
+                ), 0) as bucket_index,
+                COUNT(*) as count,
+                mm.min_latency as min_latency,
+                mm.max_latency as max_latency
+            FROM traces, mm
+            WHERE {conditions}
+            GROUP BY bucket_index
+        """
+
+        params = tuple(range_params) + (num_buckets, num_buckets) + tuple(range_params)
+        results = self.db.execute_query(query, params)
 
-        if not results or not results[0]["min_latency"]:
+        if not results:
             return []
 
         min_lat = results[0]["min_latency"]
         max_lat = results[0]["max_latency"]
         bucket_width = (max_lat - min_lat) / num_buckets
-
-        # Create histogram buckets
-        distribution = []
-        for i in range(num_buckets):
-            bucket_min = min_lat + (i * bucket_width)
-            bucket_max = bucket_min + bucket_width
-
-            query_count = """
-                SELECT COUNT(*) as count
-                FROM traces
-                WHERE duration_ms >= ? AND duration_ms < ?
-            """
-
-            count_params = [bucket_min, bucket_max]
-
-            if start_time:
-                query_count += " AND start_time >= ?"
-                count_params.append(start_time)
-
-            if end_time:
-                query_count += " AND start_time <= ?"
-                count_params.append(end_time)
-
-            count_result = self.db.execute_query(query_count, tuple(count_params))
-            count = count_result[0]["count"] if count_result else 0
-
-            distribution.append({
-                "bucket_min": bucket_min,
-                "bucket_max": bucket_max,
-                "count": count,
-            })
-
-        return distribution
+        counts = {row["bucket_index"]: row["count"] for row in results}
+
+        return [
+            {
+                "bucket_min": min_lat + (i * bucket_width),
+                "bucket_max": min_lat + ((i + 1) * bucket_width),
+                "count": counts.get(i, 0),
+            }
+            for i in range(num_buckets)
+        ]
@@ -1,6 +1,9 @@
 """Database connection management and schema initialization for SQLite."""
 
+import os
+import queue
 import sqlite3
+import threading
 from contextlib import contextmanager
 from pathlib import Path
 from typing import Generator, Optional
@@ -8,9 +11,72 @@ from typing import Generator, Optional
 from ..config import DATABASE_PATH, SQLITE_PRAGMAS
 
 
+class SqlitePool:
+    """Small pool of read-only SQLite connections for concurrent reads.
+
+    With WAL mode enabled, readers don't block the writer, so dashboard
+    pages can fetch cost/latency/error aggregates concurrently.
+    """
+
+    # Pragmas that require write access; the writer connection applies them
+    _WRITER_ONLY_PRAGMAS = ("page_size", "journal_mode")
+
+    def __init__(self, db_path: str, size: Optional[int] = None):
+        """Initialize the pool with pre-opened connections.
+
+        Args:
+            db_path: Path to SQLite database file
+            size: Pool size. Defaults to min(cpu_count, 8).
+        """
+        self.db_path = db_path
+        self.size = size or min(os.cpu_count() or 1, 8)
+        self._pool: queue.Queue = queue.Queue(maxsize=self.size)
+        for _ in range(self.size):
+            self._pool.put(self._open_connection())
+
+    def _open_connection(self) -> sqlite3.Connection:
+        """Open a read-only connection with pragmas applied once."""
+        conn = sqlite3.connect(
+            f"file:{self.db_path}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+            cached_statements=256,
+        )
+        conn.row_factory = sqlite3.Row
+
+        for pragma, value in SQLITE_PRAGMAS.items():
+            if pragma not in self._WRITER_ONLY_PRAGMAS:
+                conn.execute(f"PRAGMA {pragma}={value}")
+
+        return conn
+
+    @contextmanager
+    def read(self) -> Generator[sqlite3.Connection, None, None]:
+        """Borrow a read-only connection from the pool.
+
+        Yields:
+            SQLite connection object
+        """
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def close_all(self):
+        """Close all pooled connections."""
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
 class Database:
     """SQLite database manager with connection pooling and schema management."""
 
+    # Bump whenever _init_schema's DDL changes so existing databases
+    # re-run it; matching PRAGMA user_version skips the ~20 DDL
+    # statements on every subsequent instantiation
+    _SCHEMA_VERSION = 3
+
     def __init__(self, db_path: Optional[str] = None):
         """Initialize database manager.
 
@@ -18,6 +84,14 @@ class Database:
             db_path: Path to SQLite database file. If None, uses config default.
         """
         self.db_path = db_path or DATABASE_PATH
+        self._read_pool: Optional[SqlitePool] = None
+        # Single persistent writer connection (WAL allows one writer and
+        # many readers); the lock serializes writes across threads
+        self._writer: Optional[sqlite3.Connection] = None
+        self._writer_lock = threading.Lock()
+        # Bumped on every write; TTL caches key on it so results are
+        # invalidated as soon as new rows land
+        self.write_generation = 0
         self._ensure_db_directory()
         self._init_schema()
 
@@ -32,7 +106,11 @@ class Database:
         Returns:
             SQLite connection object
         """
-        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        # cached_statements bumped from the default 128 so the repeated
+        # dashboard/tracker query strings stay in the prepared-statement cache
+        conn = sqlite3.connect(
+            self.db_path, check_same_thread=False, cached_statements=256
+        )
         conn.row_factory = sqlite3.Row  # Enable column access by name
 
         # Apply SQLite pragmas for performance and safety
@@ -41,28 +119,78 @@ class Database:
 
         return conn
 
+    def _get_writer(self) -> sqlite3.Connection:
+        """Get the persistent writer connection, opening it on first use.
+
+        Returns:
+            SQLite connection object
+        """
+        if self._writer is None:
+            self._writer = self.get_connection()
+        return self._writer
+
     @contextmanager
     def get_cursor(self) -> Generator[sqlite3.Cursor, None, None]:
         """Context manager for database operations with automatic commit/rollback.
 
+        Reuses the persistent writer connection, so per-statement cost is
+        just the statement itself — no connect/PRAGMA replay and no page
+        cache thrown away between writes.
+
         Yields:
             SQLite cursor object
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        try:
-            yield cursor
-            conn.commit()
-        except Exception:
-            conn.rollback()
-            raise
-        finally:
-            cursor.close()
-            conn.close()
+        with self._writer_lock:
+            conn = self._get_writer()
+            cursor = conn.cursor()
+            try:
+                yield cursor
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+                # Let SQLite refresh planner statistics opportunistically
+                conn.execute("PRAGMA optimize")
+
+    @contextmanager
+    def read(self) -> Generator[sqlite3.Connection, None, None]:
+        """Borrow a pooled read-only connection for SELECT statements.
+
+        Yields:
+            SQLite connection object
+        """
+        if self._read_pool is None:
+            self._read_pool = SqlitePool(self.db_path)
+        with self._read_pool.read() as conn:
+            yield conn
+
+    @contextmanager
+    def write(self) -> Generator[sqlite3.Connection, None, None]:
+        """Context manager for the writer connection with commit/rollback.
+
+        Yields:
+            SQLite connection object
+        """
+        with self._writer_lock:
+            conn = self._get_writer()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
 
     def _init_schema(self):
         """Initialize database schema if it doesn't exist."""
         with self.get_cursor() as cursor:
+            # Sentinel check: an already-initialized database at the
+            # current schema version skips the DDL replay entirely
+            version = cursor.execute("PRAGMA user_version").fetchone()[0]
+            if version == self._SCHEMA_VERSION:
+                return
+
             # Create traces table
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS traces (
@@ -77,11 +205,22 @@ class Database:
                     status TEXT NOT NULL,
                     error_message TEXT,
                     metadata TEXT,
+                    tags TEXT,
+                    model TEXT,
+                    cost_usd REAL,
+                    input_tokens INTEGER,
+                    output_tokens INTEGER,
+                    total_tokens INTEGER,
                     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (parent_trace_id) REFERENCES traces(trace_id)
                 )
             """)
 
+            # Denormalized LLM summary columns (model/cost/tokens) live on
+            # traces so CostTracker raw-range queries need no join; add
+            # them to databases created before the columns existed
+            self._ensure_trace_summary_columns(cursor)
+
             # Create LLM calls table
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS llm_calls (
@@ -135,6 +274,58 @@ class Database:
                 )
             """)
 
+            # Create incremental rollup table, maintained at write time so
+            # dashboard time-range queries sum O(hours) rows instead of
+            # re-scanning raw llm_calls/traces
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS metrics_rollup (
+                    time_bucket_hour TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    request_count INTEGER DEFAULT 0,
+                    error_count INTEGER DEFAULT 0,
+                    sum_cost REAL DEFAULT 0.0,
+                    sum_tokens INTEGER DEFAULT 0,
+                    sum_input_tokens INTEGER DEFAULT 0,
+                    sum_output_tokens INTEGER DEFAULT 0,
+                    sum_latency_ms REAL DEFAULT 0.0,
+                    sum_sq_latency_ms REAL DEFAULT 0.0,
+                    PRIMARY KEY (time_bucket_hour, model, status)
+                )
+            """)
+
+            # Create per-session rollup, also maintained at write time:
+            # session breakdowns read one row per session instead of
+            # grouping the full traces table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS session_rollup (
+                    session_id TEXT PRIMARY KEY,
+                    first_seen REAL NOT NULL,
+                    last_seen REAL NOT NULL,
+                    total_cost REAL DEFAULT 0.0,
+                    total_requests INTEGER DEFAULT 0
+                )
+            """)
+
+            # Create latency rollup covering every trace type (chains and
+            # tools included, unlike metrics_rollup which is per-LLM-call)
+            # so latency trend queries stay O(buckets)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS latency_rollup (
+                    time_bucket_hour TEXT NOT NULL,
+                    trace_type TEXT NOT NULL,
+                    request_count INTEGER DEFAULT 0,
+                    sum_latency_ms REAL DEFAULT 0.0,
+                    min_latency_ms REAL,
+                    max_latency_ms REAL,
+                    PRIMARY KEY (time_bucket_hour, trace_type)
+                )
+            """)
+
+            # Populate the rollups from existing raw rows so pre-upgrade
+            # databases don't report empty hour-windowed metrics
+            self._backfill_rollups(cursor)
+
             # Create alerts table
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS alerts (
@@ -164,6 +355,150 @@ class Database:
             # Create full-text search virtual table
             self._create_fts_table(cursor)
 
+            cursor.execute(f"PRAGMA user_version = {self._SCHEMA_VERSION}")
+
+    def _ensure_trace_summary_columns(self, cursor: sqlite3.Cursor):
+        """Add later-added trace columns to older databases.
+
+        Args:
+            cursor: Active database cursor
+        """
+        existing = {
+            row[1] for row in cursor.execute("PRAGMA table_info(traces)").fetchall()
+        }
+
+        columns = {
+            "model": "TEXT",
+            "cost_usd": "REAL",
+            "input_tokens": "INTEGER",
+            "output_tokens": "INTEGER",
+            "total_tokens": "INTEGER",
+            "tags": "TEXT",
+        }
+
+        missing = [name for name in columns if name not in existing]
+        for name in missing:
+            cursor.execute(f"ALTER TABLE traces ADD COLUMN {name} {columns[name]}")
+
+        # tags has no historical source to backfill from; the LLM summary
+        # columns copy over from llm_calls
+        if any(name != "tags" for name in missing):
+            # Backfill once from llm_calls so historical rows stay queryable
+            cursor.execute("""
+                UPDATE traces SET
+                    model = (SELECT model FROM llm_calls
+                             WHERE llm_calls.trace_id = traces.trace_id),
+                    cost_usd = (SELECT cost_usd FROM llm_calls
+                                WHERE llm_calls.trace_id = traces.trace_id),
+                    input_tokens = (SELECT input_tokens FROM llm_calls
+                                    WHERE llm_calls.trace_id = traces.trace_id),
+                    output_tokens = (SELECT output_tokens FROM llm_calls
+                                     WHERE llm_calls.trace_id = traces.trace_id),
+                    total_tokens = (SELECT total_tokens FROM llm_calls
+                                    WHERE llm_calls.trace_id = traces.trace_id)
+                WHERE EXISTS (
+                    SELECT 1 FROM llm_calls
+                    WHERE llm_calls.trace_id = traces.trace_id
+                )
+            """)
+
+    def _backfill_rollups(self, cursor: sqlite3.Cursor):
+        """Populate the write-time rollup tables from existing raw rows.
+
+        The rollups are normally maintained incrementally by the ingestion
+        callback, so a database upgraded from a version without them would
+        answer every hour-windowed query with zeros for its historical
+        data. Each table is filled from traces/llm_calls exactly once:
+        the backfill only runs when the table is empty, which keeps the
+        migration idempotent across schema-version bumps.
+
+        Args:
+            cursor: Active database cursor
+        """
+        # Same local-time hourly labels as format_time_bucket, so the
+        # backfilled buckets merge with incrementally written ones
+        bucket = "strftime('%Y-%m-%d-%H', datetime(t.start_time, 'unixepoch', 'localtime'))"
+
+        def empty(table: str) -> bool:
+            return not cursor.execute(
+                f"SELECT EXISTS (SELECT 1 FROM {table})"
+            ).fetchone()[0]
+
+        if empty("metrics_rollup"):
+            # Successful calls carry an llm_calls row; failures only exist
+            # on traces and are recorded under model 'unknown', mirroring
+            # record_llm_call_rollup's two call sites
+            cursor.execute(f"""
+                INSERT INTO metrics_rollup (
+                    time_bucket_hour, model, status, request_count,
+                    error_count, sum_cost, sum_tokens, sum_input_tokens,
+                    sum_output_tokens, sum_latency_ms, sum_sq_latency_ms
+                )
+                SELECT
+                    {bucket}, c.model, t.status, COUNT(*),
+                    SUM(t.status = 'error'),
+                    COALESCE(SUM(c.cost_usd), 0),
+                    COALESCE(SUM(c.total_tokens), 0),
+                    COALESCE(SUM(c.input_tokens), 0),
+                    COALESCE(SUM(c.output_tokens), 0),
+                    COALESCE(SUM(t.duration_ms), 0),
+                    COALESCE(SUM(t.duration_ms * t.duration_ms), 0)
+                FROM llm_calls c
+                JOIN traces t ON t.trace_id = c.trace_id
+                GROUP BY 1, 2, 3
+            """)
+            cursor.execute(f"""
+                INSERT INTO metrics_rollup (
+                    time_bucket_hour, model, status, request_count,
+                    error_count, sum_latency_ms, sum_sq_latency_ms
+                )
+                SELECT
+                    {bucket}, 'unknown', 'error', COUNT(*), COUNT(*),
+                    COALESCE(SUM(t.duration_ms), 0),
+                    COALESCE(SUM(t.duration_ms * t.duration_ms), 0)
+                FROM traces t
+                WHERE t.trace_type = 'llm' AND t.status = 'error'
+                  AND NOT EXISTS (
+                      SELECT 1 FROM llm_calls c WHERE c.trace_id = t.trace_id
+                  )
+                GROUP BY 1
+                ON CONFLICT(time_bucket_hour, model, status) DO UPDATE SET
+                    request_count = request_count + excluded.request_count,
+                    error_count = error_count + excluded.error_count,
+                    sum_latency_ms = sum_latency_ms + excluded.sum_latency_ms,
+                    sum_sq_latency_ms = sum_sq_latency_ms
+                        + excluded.sum_sq_latency_ms
+            """)
+
+        if empty("latency_rollup"):
+            cursor.execute(f"""
+                INSERT INTO latency_rollup (
+                    time_bucket_hour, trace_type, request_count,
+                    sum_latency_ms, min_latency_ms, max_latency_ms
+                )
+                SELECT
+                    {bucket}, t.trace_type, COUNT(*),
+                    SUM(t.duration_ms), MIN(t.duration_ms), MAX(t.duration_ms)
+                FROM traces t
+                WHERE t.duration_ms IS NOT NULL
+                GROUP BY 1, 2
+            """)
+
+        if empty("session_rollup"):
+            cursor.execute("""
+                INSERT INTO session_rollup (
+                    session_id, first_seen, last_seen, total_cost,
+                    total_requests
+                )
+                SELECT
+                    t.session_id, MIN(t.start_time), MAX(t.start_time),
+                    COALESCE(SUM(c.cost_usd), 0), COUNT(*)
+                FROM traces t
+                JOIN llm_calls c ON c.trace_id = t.trace_id
+                WHERE t.session_id IS NOT NULL
+                GROUP BY t.session_id
+            """)
+
     def _create_indexes(self, cursor: sqlite3.Cursor):
         """Create indexes for frequently queried columns."""
         indexes = [
@@ -178,11 +513,56 @@ class Database:
             "CREATE INDEX IF NOT EXISTS idx_events_type ON events(event_type)",
             "CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events(timestamp)",
             "CREATE INDEX IF NOT EXISTS idx_metrics_time ON metrics_aggregated(time_bucket)",
+            # Composite covering indexes so time-range aggregations
+            # (cost/latency by model, error rate over time) are answered
+            # from the index without touching the table
+            "CREATE INDEX IF NOT EXISTS idx_traces_start_status ON traces(start_time, status, duration_ms)",
+            "CREATE INDEX IF NOT EXISTS idx_llm_calls_trace_model ON llm_calls(trace_id, model, cost_usd, total_tokens)",
+            # Partial indexes for the error paths: only error rows are
+            # indexed, so recent-error and error-pattern queries touch
+            # O(errors) entries instead of the whole traces table
+            "CREATE INDEX IF NOT EXISTS idx_traces_errors ON traces(start_time, status) WHERE status = 'error'",
+            "CREATE INDEX IF NOT EXISTS idx_traces_errmsg ON traces(error_message) WHERE status = 'error' AND error_message IS NOT NULL",
+            # Descending cost index turns most-expensive-requests into a
+            # top-N index probe with no sort step
+            "CREATE INDEX IF NOT EXISTS idx_llm_calls_cost ON llm_calls(cost_usd DESC, total_tokens)",
+            # Covering index over the denormalized LLM summary columns for
+            # join-free cost queries on traces
+            "CREATE INDEX IF NOT EXISTS idx_traces_model_time ON traces(model, start_time, cost_usd, total_tokens)",
+            # Latency-path indexes: partial covering index for duration
+            # scans over a time range, a type-first variant for per-type
+            # breakdowns, and a model-first llm_calls index so
+            # model-filtered latency joins probe by model
+            "CREATE INDEX IF NOT EXISTS idx_traces_time_dur ON traces(start_time, duration_ms) WHERE duration_ms IS NOT NULL",
+            "CREATE INDEX IF NOT EXISTS idx_traces_type_time_dur ON traces(trace_type, start_time, duration_ms)",
+            "CREATE INDEX IF NOT EXISTS idx_llm_calls_model_trace ON llm_calls(model, trace_id)",
+            # Partial descending cost index on traces: the top-K expensive
+            # query walks the first K entries in index order, a maintained
+            # top-K without any write-side eviction bookkeeping
+            "CREATE INDEX IF NOT EXISTS idx_traces_cost ON traces(cost_usd DESC) WHERE model IS NOT NULL",
+            # Same treatment for the slowest-requests panel: descending
+            # duration walk instead of a full-table sort
+            "CREATE INDEX IF NOT EXISTS idx_traces_dur_desc ON traces(duration_ms DESC) WHERE duration_ms IS NOT NULL",
+            # Composite indexes matching the repository lookup patterns:
+            # filter column first, ORDER BY column second in query order, so
+            # session/child listings are pure index range scans with no
+            # separate sort pass. Events are fetched per-trace in timestamp
+            # order, so the same treatment applies there.
+            "CREATE INDEX IF NOT EXISTS idx_traces_session_time ON traces(session_id, start_time DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_traces_parent_time ON traces(parent_trace_id, start_time ASC)",
+            "CREATE INDEX IF NOT EXISTS idx_events_trace_ts ON events(trace_id, timestamp ASC)",
+            "CREATE INDEX IF NOT EXISTS idx_metrics_bucket ON metrics_aggregated(time_bucket DESC)",
+            # Partial index over tagged traces only: tag filters scan
+            # O(tagged rows) index entries instead of the whole table
+            "CREATE INDEX IF NOT EXISTS idx_traces_tags ON traces(tags) WHERE tags IS NOT NULL",
         ]
 
         for index_sql in indexes:
             cursor.execute(index_sql)
 
+        # Refresh planner statistics so the new indexes get picked
+        cursor.execute("ANALYZE")
+
     def _create_fts_table(self, cursor: sqlite3.Cursor):
         """Create full-text search table for prompts and responses."""
         try:
@@ -199,7 +579,8 @@ class Database:
                         prompt,
                         response,
                         content=llm_calls,
-                        content_rowid=id
+                        content_rowid=id,
+                        tokenize='porter unicode61'
                     )
                 """)
 
@@ -222,9 +603,12 @@ class Database:
                     END
                 """)
 
+                # Scoped to the indexed columns: updates that touch only
+                # metadata (cost, tokens, ...) skip the FTS delete+insert
+                # pair entirely
                 cursor.execute("""
                     CREATE TRIGGER IF NOT EXISTS llm_calls_fts_update
-                    AFTER UPDATE ON llm_calls
+                    AFTER UPDATE OF prompt, response ON llm_calls
                     BEGIN
                         INSERT INTO llm_calls_fts(llm_calls_fts, rowid, trace_id, prompt, response)
                         VALUES ('delete', old.id, old.trace_id, old.prompt, old.response);
@@ -246,9 +630,69 @@ class Database:
         Returns:
             List of row dictionaries
         """
-        with self.get_cursor() as cursor:
-            cursor.execute(query, params)
-            return [dict(row) for row in cursor.fetchall()]
+        with self.read() as conn:
+            cursor = conn.execute(query, params)
+            # Iterate the cursor directly: fetchall() would materialize an
+            # intermediate list of Row objects only to be discarded here
+            return [dict(row) for row in cursor]
+
+    def execute_query_iter(
+        self, query: str, params: tuple = ()
+    ) -> Generator[sqlite3.Row, None, None]:
+        """Execute a SELECT query and yield rows one at a time.
+
+        Yields sqlite3.Row objects (dict-style access) without building
+        the full list of per-row dicts, so only one row is live at a
+        time. The pooled read connection stays borrowed until the
+        iterator is exhausted or closed.
+
+        Args:
+            query: SQL query string
+            params: Query parameters
+
+        Yields:
+            sqlite3.Row for each result row
+        """
+        with self.read() as conn:
+            cursor = conn.execute(query, params)
+            yield from cursor
+
+    def execute_scalar_column(self, query: str, params: tuple = ()) -> list:
+        """Execute a SELECT of a single column and return its values.
+
+        Skips Row and dict construction entirely — one Python object per
+        value instead of three — for callers that only need one column.
+
+        Args:
+            query: SQL query string selecting a single column
+            params: Query parameters
+
+        Returns:
+            List of values from the first selected column
+        """
+        with self.read() as conn:
+            cursor = conn.execute(query, params)
+            return [row[0] for row in cursor]
+
+    def execute_dataframe(self, query: str, params: tuple = ()):
+        """Execute a SELECT query and return the results as a DataFrame.
+
+        pd.read_sql_query materializes rows at the C level, skipping the
+        intermediate list-of-dicts and per-row dict construction that
+        execute_query performs. Intended for dashboard callers that build
+        DataFrames anyway.
+
+        Args:
+            query: SQL query string
+            params: Query parameters
+
+        Returns:
+            pandas DataFrame with one column per selected field
+        """
+        import pandas as pd
+
+        with self.read() as conn:
+            return pd.read_sql_query(query, conn, params=params)
 
     def execute_insert(self, query: str, params: tuple = ()) -> int:
         """Execute an INSERT query and return the last row ID.
@@ -262,8 +706,29 @@ class Database:
         """
         with self.get_cursor() as cursor:
             cursor.execute(query, params)
+            self.write_generation += 1
             return cursor.lastrowid
 
+    def execute_many(self, query: str, params_list: list) -> int:
+        """Execute an INSERT/UPDATE for many parameter tuples in one commit.
+
+        All rows share a single transaction, so the per-commit fsync is
+        amortized across the batch instead of paid per row.
+
+        Args:
+            query: SQL query string
+            params_list: List of parameter tuples
+
+        Returns:
+            Number of affected rows
+        """
+        if not params_list:
+            return 0
+        with self.get_cursor() as cursor:
+            cursor.executemany(query, params_list)
+            self.write_generation += 1
+            return cursor.rowcount
+
     def execute_update(self, query: str, params: tuple = ()) -> int:
         """Execute an UPDATE query and return number of affected rows.
 
@@ -276,6 +741,7 @@ class Database:
         """
         with self.get_cursor() as cursor:
             cursor.execute(query, params)
+            self.write_generation += 1
             return cursor.rowcount
 
     def execute_delete(self, query: str, params: tuple = ()) -> int:
@@ -290,8 +756,19 @@ class Database:
         """
         with self.get_cursor() as cursor:
             cursor.execute(query, params)
+            self.write_generation += 1
             return cursor.rowcount
 
+    def close_all(self):
+        """Close the writer connection and the read pool."""
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        if self._read_pool is not None:
+            self._read_pool.close_all()
+            self._read_pool = None
+
 
 # Global database instance
 _db_instance: Optional[Database] = None
@@ -1,6 +1,9 @@
 """Repository classes for data access operations."""
 
-from typing import Dict, List, Optional, Any
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional
+import sqlite3
+import threading
 import time
 
 from .database import get_database, Database
@@ -15,9 +18,33 @@ from ..utils import (
 class TraceRepository:
     """Repository for trace operations."""
 
+    # Entries kept in the write-through hot-trace cache; sized to cover
+    # the working set of in-flight and just-completed spans
+    _HOT_CACHE_MAX = 4096
+
     def __init__(self, db: Optional[Database] = None):
         self.db = db or get_database()
 
+        # Write-through LRU of recently written trace rows: get_trace on
+        # a span that was just created or completed by this process is
+        # answered from memory without touching the read pool. Safe
+        # because traces are only ever written through this repository
+        # and never deleted.
+        self._hot_traces: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._hot_lock = threading.Lock()
+
+    def _cache_trace(self, row: Dict[str, Any]):
+        """Insert or refresh a trace row in the hot cache.
+
+        Args:
+            row: Full trace row as stored in the database
+        """
+        with self._hot_lock:
+            self._hot_traces[row["trace_id"]] = row
+            self._hot_traces.move_to_end(row["trace_id"])
+            while len(self._hot_traces) > self._HOT_CACHE_MAX:
+                self._hot_traces.popitem(last=False)
+
     def create_trace(
         self,
         trace_id: str,
@@ -27,6 +54,7 @@ class TraceRepository:
         session_id: Optional[str] = None,
         parent_trace_id: Optional[str] = None,
         metadata: Optional[Dict[str, Any]] = None,
+        tags: Optional[List[str]] = None,
     ) -> str:
         """Create a new trace record.
 
@@ -38,6 +66,100 @@ class TraceRepository:
             session_id: Optional session identifier
             parent_trace_id: Optional parent trace ID for nested operations
             metadata: Optional metadata dictionary
+            tags: Optional tags, stored as a JSON array in their own
+                column so tag filters don't scan metadata JSON
+
+        Returns:
+            trace_id
+        """
+        query = """
+            INSERT INTO traces (
+                trace_id, parent_trace_id, session_id, trace_type,
+                name, start_time, status, metadata, tags
+            ) VALUES (?, ?, ?, ?, ?, ?, 'pending', ?, ?)
+        """
+
+        params = (
+            trace_id,
+            parent_trace_id,
+            session_id,
+            trace_type,
+            name,
+            start_time,
+            serialize_to_json(metadata) if metadata else None,
+            serialize_to_json(tags) if tags else None,
+        )
+
+        self.db.execute_insert(query, params)
+
+        self._cache_trace(
+            {
+                "trace_id": trace_id,
+                "parent_trace_id": parent_trace_id,
+                "session_id": session_id,
+                "trace_type": trace_type,
+                "name": name,
+                "start_time": start_time,
+                "end_time": None,
+                "duration_ms": None,
+                "status": "pending",
+                "error_message": None,
+                "metadata": params[6],
+                "tags": params[7],
+                "model": None,
+                "cost_usd": None,
+                "input_tokens": None,
+                "output_tokens": None,
+                "total_tokens": None,
+                "created_at": time.strftime(
+                    "%Y-%m-%d %H:%M:%S", time.gmtime()
+                ),
+            }
+        )
+        return trace_id
+
+    def create_trace_complete(
+        self,
+        trace_id: str,
+        trace_type: str,
+        name: str,
+        start_time: float,
+        end_time: float,
+        status: str = "success",
+        session_id: Optional[str] = None,
+        parent_trace_id: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        tags: Optional[List[str]] = None,
+        error_message: Optional[str] = None,
+        model: Optional[str] = None,
+        cost_usd: Optional[float] = None,
+        input_tokens: Optional[int] = None,
+        output_tokens: Optional[int] = None,
+        total_tokens: Optional[int] = None,
+    ) -> str:
+        """Create a trace that already completed, in a single INSERT.
+
+        Fuses create_trace + update_trace_completion for spans whose
+        row was never needed on disk mid-flight (no children, no events):
+        one statement instead of an INSERT followed by a wide UPDATE.
+
+        Args:
+            trace_id: Unique trace identifier
+            trace_type: Type of trace ('llm', 'chain', 'agent', 'tool')
+            name: Name of the operation
+            start_time: Start timestamp
+            end_time: End timestamp
+            status: Status ('success' or 'error')
+            session_id: Optional session identifier
+            parent_trace_id: Optional parent trace ID for nested operations
+            metadata: Optional metadata dictionary
+            tags: Optional tags, stored as a JSON array
+            error_message: Optional error message if status is 'error'
+            model: Optional model name for LLM traces
+            cost_usd: Optional cost in USD for LLM traces
+            input_tokens: Optional input token count for LLM traces
+            output_tokens: Optional output token count for LLM traces
+            total_tokens: Optional total token count for LLM traces
 
         Returns:
             trace_id
@@ -45,8 +167,10 @@ class TraceRepository:
         query = """
             INSERT INTO traces (
                 trace_id, parent_trace_id, session_id, trace_type,
-                name, start_time, status, metadata
-            ) VALUES (?, ?, ?, ?, ?, ?, 'pending', ?)
+                name, start_time, end_time, duration_ms, status,
+                error_message, metadata, tags, model, cost_usd,
+                input_tokens, output_tokens, total_tokens
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """
 
         params = (
@@ -56,10 +180,45 @@ class TraceRepository:
             trace_type,
             name,
             start_time,
+            end_time,
+            calculate_duration_ms(start_time, end_time),
+            status,
+            error_message,
             serialize_to_json(metadata) if metadata else None,
+            serialize_to_json(tags) if tags else None,
+            model,
+            cost_usd,
+            input_tokens,
+            output_tokens,
+            total_tokens,
         )
 
         self.db.execute_insert(query, params)
+
+        self._cache_trace(
+            {
+                "trace_id": trace_id,
+                "parent_trace_id": parent_trace_id,
+                "session_id": session_id,
+                "trace_type": trace_type,
+                "name": name,
+                "start_time": start_time,
+                "end_time": end_time,
+                "duration_ms": params[7],
+                "status": status,
+                "error_message": error_message,
+                "metadata": params[10],
+                "tags": params[11],
+                "model": model,
+                "cost_usd": cost_usd,
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": total_tokens,
+                "created_at": time.strftime(
+                    "%Y-%m-%d %H:%M:%S", time.gmtime()
+                ),
+            }
+        )
         return trace_id
 
     def update_trace_completion(
@@ -69,27 +228,71 @@ class TraceRepository:
         start_time: float,
         status: str = "success",
         error_message: Optional[str] = None,
+        model: Optional[str] = None,
+        cost_usd: Optional[float] = None,
+        input_tokens: Optional[int] = None,
+        output_tokens: Optional[int] = None,
+        total_tokens: Optional[int] = None,
     ):
         """Update trace with completion data.
 
+        For LLM traces the model/cost/token summary can be written in the
+        same UPDATE, keeping the denormalized columns on traces in sync
+        without an extra statement.
+
         Args:
             trace_id: Trace identifier
             end_time: End timestamp
             start_time: Start timestamp (for duration calculation)
             status: Status ('success' or 'error')
             error_message: Optional error message if status is 'error'
+            model: Optional model name for LLM traces
+            cost_usd: Optional cost in USD for LLM traces
+            input_tokens: Optional input token count for LLM traces
+            output_tokens: Optional output token count for LLM traces
+            total_tokens: Optional total token count for LLM traces
         """
         duration_ms = calculate_duration_ms(start_time, end_time)
 
-        query = """
-            UPDATE traces
-            SET end_time = ?, duration_ms = ?, status = ?, error_message = ?
-            WHERE trace_id = ?
-        """
+        if model is not None:
+            query = """
+                UPDATE traces
+                SET end_time = ?, duration_ms = ?, status = ?, error_message = ?,
+                    model = ?, cost_usd = ?, input_tokens = ?, output_tokens = ?,
+                    total_tokens = ?
+                WHERE trace_id = ?
+            """
+            params = (
+                end_time, duration_ms, status, error_message,
+                model, cost_usd, input_tokens, output_tokens,
+                total_tokens, trace_id,
+            )
+        else:
+            query = """
+                UPDATE traces
+                SET end_time = ?, duration_ms = ?, status = ?, error_message = ?
+                WHERE trace_id = ?
+            """
+            params = (end_time, duration_ms, status, error_message, trace_id)
 
-        params = (end_time, duration_ms, status, error_message, trace_id)
         self.db.execute_update(query, params)
 
+        # Keep the hot cache write-through: mutate the cached row in
+        # place so a follow-up get_trace sees the completed span
+        with self._hot_lock:
+            cached = self._hot_traces.get(trace_id)
+            if cached is not None:
+                cached["end_time"] = end_time
+                cached["duration_ms"] = duration_ms
+                cached["status"] = status
+                cached["error_message"] = error_message
+                if model is not None:
+                    cached["model"] = model
+                    cached["cost_usd"] = cost_usd
+                    cached["input_tokens"] = input_tokens
+                    cached["output_tokens"] = output_tokens
+                    cached["total_tokens"] = total_tokens
+
     def get_trace(self, trace_id: str) -> Optional[Dict[str, Any]]:
         """Get a trace by ID.
 
@@ -99,9 +302,22 @@ class TraceRepository:
         Returns:
             Trace dictionary or None
         """
+        with self._hot_lock:
+            cached = self._hot_traces.get(trace_id)
+            # Completed traces are immutable, so they are always safe to
+            # serve from memory; pending rows go to the database in case
+            # another repository instance completed them
+            if cached is not None and cached["status"] != "pending":
+                self._hot_traces.move_to_end(trace_id)
+                # Copy so callers can't mutate the cached row
+                return dict(cached)
+
         query = "SELECT * FROM traces WHERE trace_id = ?"
         results = self.db.execute_query(query, (trace_id,))
-        return results[0] if results else None
+        if results:
+            self._cache_trace(results[0])
+            return dict(results[0])
+        return None
 
     def get_traces_by_session(self, session_id: str) -> List[Dict[str, Any]]:
         """Get all traces for a session.
@@ -139,23 +355,57 @@ class TraceRepository:
             end_time = time.time()
             start_time = end_time - (hours * 3600)
 
-        if start_time and end_time:
-            query = """
-                SELECT * FROM traces
-                WHERE start_time >= ? AND start_time <= ?
-                ORDER BY start_time DESC
-            """
-            return self.db.execute_query(query, (start_time, end_time))
-        elif start_time:
-            query = """
-                SELECT * FROM traces
-                WHERE start_time >= ?
-                ORDER BY start_time DESC
-            """
-            return self.db.execute_query(query, (start_time,))
-        else:
-            query = "SELECT * FROM traces ORDER BY start_time DESC LIMIT 1000"
-            return self.db.execute_query(query)
+        # One canonical statement for every branch: missing bounds bind
+        # sentinel values (0 / far future) and a missing limit binds -1
+        # (unlimited in SQLite), so alternating call shapes all hit the
+        # same slot in sqlite3's prepared-statement cache
+        query = """
+            SELECT * FROM traces
+            WHERE start_time >= ? AND start_time <= ?
+            ORDER BY start_time DESC
+            LIMIT ?
+        """
+        limit = -1 if start_time else 1000
+        return self.db.execute_query(
+            query, (start_time or 0.0, end_time or 9e18, limit)
+        )
+
+    def get_traces_df_by_time_range(
+        self,
+        start_time: Optional[float] = None,
+        end_time: Optional[float] = None,
+        hours: Optional[int] = None,
+        limit: int = 1000,
+    ):
+        """Get traces within a time range as a DataFrame.
+
+        DataFrame counterpart of get_traces_by_time_range for dashboard
+        callers: rows stream straight into pandas and the limit is applied
+        in SQL instead of slicing in Python.
+
+        Args:
+            start_time: Start timestamp (optional)
+            end_time: End timestamp (optional)
+            hours: Number of hours back from now (optional)
+            limit: Maximum number of traces to return
+
+        Returns:
+            pandas DataFrame of traces, newest first
+        """
+        if hours:
+            end_time = time.time()
+            start_time = end_time - (hours * 3600)
+
+        # Same canonical-statement treatment as get_traces_by_time_range
+        query = """
+            SELECT * FROM traces
+            WHERE start_time >= ? AND start_time <= ?
+            ORDER BY start_time DESC
+            LIMIT ?
+        """
+        return self.db.execute_dataframe(
+            query, (start_time or 0.0, end_time or 9e18, limit)
+        )
 
     def get_child_traces(self, parent_trace_id: str) -> List[Dict[str, Any]]:
         """Get all child traces of a parent trace.
@@ -252,34 +502,78 @@ class LLMCallRepository:
         results = self.db.execute_query(query, (trace_id,))
         return results[0] if results else None
 
-    def search_llm_calls(self, search_term: str, limit: int = 100) -> List[Dict[str, Any]]:
+    def get_llm_calls_by_trace_ids(self, trace_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get LLM calls for multiple trace IDs in a single query.
+
+        Args:
+            trace_ids: List of trace identifiers
+
+        Returns:
+            Dictionary mapping trace_id to LLM call dictionary
+        """
+        if not trace_ids:
+            return {}
+
+        placeholders = ",".join("?" * len(trace_ids))
+        query = f"SELECT * FROM llm_calls WHERE trace_id IN ({placeholders})"
+        results = self.db.execute_query(query, tuple(trace_ids))
+        return {row["trace_id"]: row for row in results}
+
+    def search_llm_calls(
+        self, search_term: str, limit: int = 100
+    ) -> Iterator[sqlite3.Row]:
         """Search LLM calls using full-text search.
 
+        Yields rows lazily instead of materializing the full result, and
+        on the FTS path projects snippet() extracts in place of the raw
+        prompt/response columns: the match context is usually all a
+        search UI shows, so multi-KB text bodies stay on disk.
+        sqlite3.Row supports name and index access without per-row dict
+        construction.
+
         Args:
             search_term: Search term
             limit: Maximum number of results
 
-        Returns:
-            List of matching LLM call dictionaries
+        Yields:
+            sqlite3.Row for each matching LLM call, best match first.
+            FTS rows carry prompt_snippet/response_snippet instead of
+            the full prompt/response text.
         """
         try:
             query = """
-                SELECT llm_calls.*
+                SELECT llm_calls.id, llm_calls.trace_id, llm_calls.model,
+                       llm_calls.provider, llm_calls.input_tokens,
+                       llm_calls.output_tokens, llm_calls.total_tokens,
+                       llm_calls.cost_usd,
+                       snippet(llm_calls_fts, 1, '<b>', '</b>', '…', 16)
+                           as prompt_snippet,
+                       snippet(llm_calls_fts, 2, '<b>', '</b>', '…', 16)
+                           as response_snippet,
+                       bm25(llm_calls_fts) as rank
                 FROM llm_calls
                 JOIN llm_calls_fts ON llm_calls.id = llm_calls_fts.rowid
                 WHERE llm_calls_fts MATCH ?
+                ORDER BY rank
                 LIMIT ?
             """
-            return self.db.execute_query(query, (search_term, limit))
+            yield from self.db.execute_query_iter(query, (search_term, limit))
+            return
         except Exception:
-            # Fallback to simple LIKE search if FTS is not available
-            query = """
-                SELECT * FROM llm_calls
-                WHERE prompt LIKE ? OR response LIKE ?
-                LIMIT ?
-            """
-            search_pattern = f"%{search_term}%"
-            return self.db.execute_query(query, (search_pattern, search_pattern, limit))
+            # Fall through to the LIKE search if FTS is not available.
+            # FTS failures surface on execute, before the first row is
+            # yielded, so the fallback never duplicates results.
+            pass
+
+        query = """
+            SELECT * FROM llm_calls
+            WHERE prompt LIKE ? OR response LIKE ?
+            LIMIT ?
+        """
+        search_pattern = f"%{search_term}%"
+        yield from self.db.execute_query_iter(
+            query, (search_pattern, search_pattern, limit)
+        )
 
 
 class EventRepository:
@@ -323,6 +617,37 @@ class EventRepository:
 
         return self.db.execute_insert(query, params)
 
+    def create_events(self, events: List[Dict[str, Any]]) -> int:
+        """Create many event records in a single transaction.
+
+        Bulk ingestion paths (replays, imports) pay one commit for the
+        whole batch instead of one per event.
+
+        Args:
+            events: List of dictionaries with trace_id, event_type,
+                event_name, timestamp and optional data
+
+        Returns:
+            Number of inserted records
+        """
+        query = """
+            INSERT INTO events (trace_id, event_type, event_name, timestamp, data)
+            VALUES (?, ?, ?, ?, ?)
+        """
+
+        params_list = [
+            (
+                event["trace_id"],
+                event["event_type"],
+                event["event_name"],
+                event["timestamp"],
+                serialize_to_json(event["data"]) if event.get("data") else None,
+            )
+            for event in events
+        ]
+
+        return self.db.execute_many(query, params_list)
+
     def get_events_for_trace(self, trace_id: str) -> List[Dict[str, Any]]:
         """Get all events for a trace.
 
@@ -394,6 +719,180 @@ class MetricsRepository:
 
         self.db.execute_insert(query, params)
 
+    def upsert_aggregated_metrics_batch(
+        self, rows: List[Dict[str, Any]]
+    ) -> int:
+        """Upsert aggregated metrics for many buckets in one statement.
+
+        A periodic aggregation pass produces one row per (bucket, model,
+        trace_type); issuing them as a single multi-row VALUES list lets
+        SQLite resolve every conflict in one parse and one B-tree pass
+        instead of N separate upserts.
+
+        Args:
+            rows: List of dicts, each with 'time_bucket', 'model',
+                'trace_type', and the metric values accepted by
+                upsert_aggregated_metrics
+
+        Returns:
+            Number of rows written
+        """
+        if not rows:
+            return 0
+
+        query = """
+            INSERT INTO metrics_aggregated (
+                time_bucket, model, trace_type, total_requests, total_errors,
+                total_tokens, total_cost_usd, avg_duration_ms,
+                p50_duration_ms, p95_duration_ms, p99_duration_ms
+            ) VALUES """ + ", ".join(
+            ["(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"] * len(rows)
+        ) + """
+            ON CONFLICT(time_bucket, model, trace_type) DO UPDATE SET
+                total_requests = excluded.total_requests,
+                total_errors = excluded.total_errors,
+                total_tokens = excluded.total_tokens,
+                total_cost_usd = excluded.total_cost_usd,
+                avg_duration_ms = excluded.avg_duration_ms,
+                p50_duration_ms = excluded.p50_duration_ms,
+                p95_duration_ms = excluded.p95_duration_ms,
+                p99_duration_ms = excluded.p99_duration_ms
+        """
+
+        params = []
+        for row in rows:
+            params.extend(
+                (
+                    row["time_bucket"],
+                    row["model"],
+                    row["trace_type"],
+                    row.get("total_requests", 0),
+                    row.get("total_errors", 0),
+                    row.get("total_tokens", 0),
+                    row.get("total_cost_usd", 0.0),
+                    row.get("avg_duration_ms", 0.0),
+                    row.get("p50_duration_ms", 0.0),
+                    row.get("p95_duration_ms", 0.0),
+                    row.get("p99_duration_ms", 0.0),
+                )
+            )
+
+        self.db.execute_insert(query, tuple(params))
+        return len(rows)
+
+    def record_llm_call_rollup(
+        self,
+        start_time: float,
+        model: str,
+        status: str,
+        cost_usd: float = 0.0,
+        total_tokens: int = 0,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        duration_ms: float = 0.0,
+    ):
+        """Incrementally update the hourly rollup for a completed LLM call.
+
+        Args:
+            start_time: Call start timestamp
+            model: Model name
+            status: Status ('success' or 'error')
+            cost_usd: Cost in USD
+            total_tokens: Total tokens
+            input_tokens: Number of input tokens
+            output_tokens: Number of output tokens
+            duration_ms: Call duration in milliseconds
+        """
+        time_bucket = format_time_bucket(start_time, "hourly")
+
+        query = """
+            INSERT INTO metrics_rollup (
+                time_bucket_hour, model, status, request_count, error_count,
+                sum_cost, sum_tokens, sum_input_tokens, sum_output_tokens,
+                sum_latency_ms, sum_sq_latency_ms
+            ) VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(time_bucket_hour, model, status) DO UPDATE SET
+                request_count = request_count + 1,
+                error_count = error_count + excluded.error_count,
+                sum_cost = sum_cost + excluded.sum_cost,
+                sum_tokens = sum_tokens + excluded.sum_tokens,
+                sum_input_tokens = sum_input_tokens + excluded.sum_input_tokens,
+                sum_output_tokens = sum_output_tokens + excluded.sum_output_tokens,
+                sum_latency_ms = sum_latency_ms + excluded.sum_latency_ms,
+                sum_sq_latency_ms = sum_sq_latency_ms + excluded.sum_sq_latency_ms
+        """
+
+        params = (
+            time_bucket,
+            model,
+            status,
+            1 if status == "error" else 0,
+            cost_usd,
+            total_tokens,
+            input_tokens,
+            output_tokens,
+            duration_ms,
+            duration_ms * duration_ms,
+        )
+
+        self.db.execute_insert(query, params)
+
+    def record_trace_latency_rollup(
+        self,
+        start_time: float,
+        trace_type: str,
+        duration_ms: float,
+    ):
+        """Incrementally update the hourly latency rollup for a trace.
+
+        Args:
+            start_time: Trace start timestamp
+            trace_type: Type of trace ('llm', 'chain', 'tool', ...)
+            duration_ms: Trace duration in milliseconds
+        """
+        time_bucket = format_time_bucket(start_time, "hourly")
+
+        query = """
+            INSERT INTO latency_rollup (
+                time_bucket_hour, trace_type, request_count,
+                sum_latency_ms, min_latency_ms, max_latency_ms
+            ) VALUES (?, ?, 1, ?, ?, ?)
+            ON CONFLICT(time_bucket_hour, trace_type) DO UPDATE SET
+                request_count = request_count + 1,
+                sum_latency_ms = sum_latency_ms + excluded.sum_latency_ms,
+                min_latency_ms = MIN(min_latency_ms, excluded.min_latency_ms),
+                max_latency_ms = MAX(max_latency_ms, excluded.max_latency_ms)
+        """
+
+        self.db.execute_insert(
+            query, (time_bucket, trace_type, duration_ms, duration_ms, duration_ms)
+        )
+
+    def record_session_rollup(
+        self,
+        session_id: str,
+        start_time: float,
+        cost_usd: float = 0.0,
+    ):
+        """Incrementally update the per-session rollup for an LLM call.
+
+        Args:
+            session_id: Session identifier
+            start_time: Call start timestamp
+            cost_usd: Cost in USD
+        """
+        query = """
+            INSERT INTO session_rollup (
+                session_id, first_seen, last_seen, total_cost, total_requests
+            ) VALUES (?, ?, ?, ?, 1)
+            ON CONFLICT(session_id) DO UPDATE SET
+                first_seen = MIN(first_seen, excluded.first_seen),
+                last_seen = MAX(last_seen, excluded.last_seen),
+                total_cost = total_cost + excluded.total_cost,
+                total_requests = total_requests + 1
+        """
+        self.db.execute_insert(query, (session_id, start_time, start_time, cost_usd))
+
     def get_metrics_by_time_range(
         self, start_bucket: str, end_bucket: str
     ) -> List[Dict[str, Any]]:
@@ -1,10 +1,11 @@
 """Tracers package for callback handlers."""
 
 from .observability_callback import ObservabilityCallback
-from .context import TraceContext, get_trace_context
+from .context import TraceContext, TraceFrame, get_trace_context
 
 __all__ = [
     "ObservabilityCallback",
     "TraceContext",
+    "TraceFrame",
     "get_trace_context",
 ]
@@ -1,24 +1,42 @@
-"""Trace context management using thread-local storage."""
+"""Trace context management using context variables."""
 
-import threading
-from typing import Optional, Dict, Any
+from contextvars import ContextVar
+from typing import Any, Dict, NamedTuple, Optional
 
+# Shared empty metadata for frames created without any; never mutated
+_EMPTY_METADATA: Dict[str, Any] = {}
 
-class TraceContext:
-    """Thread-local trace context for managing trace hierarchy."""
 
-    def __init__(self):
-        self._local = threading.local()
+class TraceFrame(NamedTuple):
+    """One entry on the trace stack.
+
+    A fixed-size tuple instead of a per-push dict: a single allocation,
+    C-level attribute access, and no per-frame key storage.
+    """
+
+    trace_id: str
+    trace_type: str
+    name: str
+    start_time: float
+    parent_trace_id: Optional[str]
+    metadata: Dict[str, Any]
+
+
+class TraceContext:
+    """Context-local trace context for managing trace hierarchy.
 
-    def _ensure_stack(self):
-        """Ensure the trace stack exists in thread-local storage."""
-        if not hasattr(self._local, "stack"):
-            self._local.stack = []
+    State lives in contextvars rather than thread-locals: threads keep
+    isolated stacks exactly as before, and concurrently awaited asyncio
+    tasks each see their own stack instead of sharing (and corrupting)
+    their event-loop thread's. The stack is an immutable tuple, so a
+    forked task naturally gets a copy-on-write view with no locking.
+    """
 
-    def _ensure_session(self):
-        """Ensure the session ID exists in thread-local storage."""
-        if not hasattr(self._local, "session_id"):
-            self._local.session_id = None
+    def __init__(self):
+        self._stack_var: ContextVar[tuple] = ContextVar("trace_stack", default=())
+        self._session_var: ContextVar[Optional[str]] = ContextVar(
+            "trace_session_id", default=None
+        )
 
     def push_trace(
         self,
@@ -37,29 +55,27 @@ class TraceContext:
             start_time: Start timestamp
             metadata: Optional metadata
         """
-        self._ensure_stack()
-
-        trace_context = {
-            "trace_id": trace_id,
-            "trace_type": trace_type,
-            "name": name,
-            "start_time": start_time,
-            "parent_trace_id": self.get_current_trace_id(),
-            "metadata": metadata or {},
-        }
-
-        self._local.stack.append(trace_context)
-
-    def pop_trace(self) -> Optional[Dict[str, Any]]:
+        frame = TraceFrame(
+            trace_id=trace_id,
+            trace_type=trace_type,
+            name=name,
+            start_time=start_time,
+            parent_trace_id=self.get_current_trace_id(),
+            metadata=metadata or _EMPTY_METADATA,
+        )
+
+        self._stack_var.set(self._stack_var.get() + (frame,))
+
+    def pop_trace(self) -> Optional[TraceFrame]:
         """Pop the current trace from the context stack.
 
         Returns:
-            Trace context dictionary or None if stack is empty
+            TraceFrame or None if stack is empty
         """
-        self._ensure_stack()
-
-        if self._local.stack:
-            return self._local.stack.pop()
+        stack = self._stack_var.get()
+        if stack:
+            self._stack_var.set(stack[:-1])
+            return stack[-1]
         return None
 
     def get_current_trace_id(self) -> Optional[str]:
@@ -68,22 +84,20 @@ class TraceContext:
         Returns:
             Current trace ID or None if stack is empty
         """
-        self._ensure_stack()
-
-        if self._local.stack:
-            return self._local.stack[-1]["trace_id"]
+        stack = self._stack_var.get()
+        if stack:
+            return stack[-1].trace_id
         return None
 
-    def get_current_trace(self) -> Optional[Dict[str, Any]]:
+    def get_current_trace(self) -> Optional[TraceFrame]:
         """Get the current trace context (top of stack).
 
         Returns:
-            Current trace context dictionary or None if stack is empty
+            TraceFrame or None if stack is empty
         """
-        self._ensure_stack()
-
-        if self._local.stack:
-            return self._local.stack[-1]
+        stack = self._stack_var.get()
+        if stack:
+            return stack[-1]
         return None
 
     def get_parent_trace_id(self) -> Optional[str]:
@@ -93,30 +107,28 @@ class TraceContext:
             Parent trace ID or None if no parent
         """
         trace = self.get_current_trace()
-        return trace["parent_trace_id"] if trace else None
+        return trace.parent_trace_id if trace else None
 
     def set_session_id(self, session_id: str):
-        """Set the session ID for the current thread.
+        """Set the session ID for the current context.
 
         Args:
             session_id: Session identifier
         """
-        self._ensure_session()
-        self._local.session_id = session_id
+        self._session_var.set(session_id)
 
     def get_session_id(self) -> Optional[str]:
-        """Get the session ID for the current thread.
+        """Get the session ID for the current context.
 
         Returns:
             Session ID or None if not set
         """
-        self._ensure_session()
-        return self._local.session_id
+        return self._session_var.get()
 
     def clear(self):
-        """Clear the entire trace context for the current thread."""
-        self._local.stack = []
-        self._local.session_id = None
+        """Clear the entire trace context for the current context."""
+        self._stack_var.set(())
+        self._session_var.set(None)
 
     def get_stack_depth(self) -> int:
         """Get the current depth of the trace stack.
@@ -124,8 +136,7 @@ class TraceContext:
         Returns:
             Number of traces in the stack
         """
-        self._ensure_stack()
-        return len(self._local.stack)
+        return len(self._stack_var.get())
 
 
 # Global trace context instance
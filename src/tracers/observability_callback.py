@@ -1,20 +1,30 @@
 """Main observability callback handler for LangChain/LangGraph integration."""
 
-from typing import Any, Dict, List, Optional, Union
+import functools
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
 from uuid import UUID
 
 from langchain_core.callbacks.base import BaseCallbackHandler
-from langchain_core.outputs import LLMResult
-from langchain_core.agents import AgentAction, AgentFinish
+
+if TYPE_CHECKING:
+    # Annotation-only imports: the handlers duck-type these objects, so
+    # deferring the imports keeps pydantic model construction off the
+    # interpreter-startup path for short-lived scripts
+    from langchain_core.agents import AgentAction, AgentFinish
+    from langchain_core.outputs import LLMResult
 
 from ..storage.database import get_database
 from ..storage.repositories import (
     TraceRepository,
     LLMCallRepository,
     EventRepository,
+    MetricsRepository,
 )
 from ..config import (
     calculate_cost,
+    ENABLE_EVENT_LOGGING,
     ENABLE_PROMPT_LOGGING,
     ENABLE_RESPONSE_LOGGING,
     MAX_PROMPT_LENGTH,
@@ -23,6 +33,41 @@ from ..config import (
 from ..utils import generate_trace_id, get_current_timestamp, truncate_string
 from .context import get_trace_context
 
+_log = logging.getLogger(__name__)
+
+# Shared result for events carrying no metadata at all; never mutated
+_EMPTY_METADATA: Dict[str, Any] = {}
+
+# Placeholder stored when prompt/response logging is turned off
+_DISABLED = "[logging disabled]"
+
+
+def _guarded(method):
+    """Wrap a callback handler so its errors never break LLM execution.
+
+    Applied once at class-definition time, replacing the old pattern of
+    building a closure per invocation and passing it through a
+    _safe_execute helper — one function object and one extra frame per
+    event that served no purpose beyond the try/except.
+
+    Args:
+        method: Handler method to wrap
+
+    Returns:
+        Wrapped method with error isolation
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        except Exception as e:
+            # Lazy %s formatting: the message (and the exception's
+            # str conversion) is only built if WARNING is emitted
+            _log.warning("Observability callback error: %s", e)
+
+    return wrapper
+
 
 class ObservabilityCallback(BaseCallbackHandler):
     """Callback handler for observability of LangChain/LangGraph operations.
@@ -54,6 +99,7 @@ class ObservabilityCallback(BaseCallbackHandler):
         self.trace_repo = TraceRepository(self.db)
         self.llm_repo = LLMCallRepository(self.db)
         self.event_repo = EventRepository(self.db)
+        self.metrics_repo = MetricsRepository(self.db)
 
         # Initialize trace context
         self.context = get_trace_context()
@@ -65,9 +111,32 @@ class ObservabilityCallback(BaseCallbackHandler):
         # Store global metadata
         self.global_metadata = metadata or {}
 
+        # Resolved once: handlers skip event construction and the event
+        # INSERT entirely when event logging is off
+        self._events_enabled = ENABLE_EVENT_LOGGING
+
         # Track run IDs to trace IDs mapping
-        self._run_id_to_trace_id: Dict[str, str] = {}
-        self._run_start_times: Dict[str, float] = {}
+        # Keyed directly by UUID: its hash comes from the 128-bit int,
+        # so lookups skip the 36-char str(run_id) allocation that every
+        # handler used to pay several times per event
+        self._run_id_to_trace_id: Dict[UUID, str] = {}
+        self._run_start_times: Dict[UUID, float] = {}
+
+        # Monotonic counterpart of _run_start_times: durations come from
+        # perf_counter deltas so an NTP step between start and end can
+        # never produce a negative or inflated duration_ms
+        self._run_perf_starts: Dict[UUID, float] = {}
+
+        # LLM trace rows deferred until completion so the common
+        # start+end pair collapses into a single fused INSERT; keyed by
+        # trace_id, flushed early if anything references the row on disk
+        self._pending_traces: Dict[str, Dict[str, Any]] = {}
+
+        # Agent-loop events buffered per parent run and written in one
+        # executemany when that chain completes: a ReAct loop emitting
+        # dozens of actions pays one INSERT round-trip instead of one
+        # per action
+        self._event_buffer: Dict[UUID, List[Dict[str, Any]]] = {}
 
     def _get_or_create_trace_id(self, run_id: UUID) -> str:
         """Get or create a trace ID for a run ID.
@@ -78,27 +147,88 @@ class ObservabilityCallback(BaseCallbackHandler):
         Returns:
             Trace ID
         """
-        run_id_str = str(run_id)
-        if run_id_str not in self._run_id_to_trace_id:
-            self._run_id_to_trace_id[run_id_str] = generate_trace_id()
-        return self._run_id_to_trace_id[run_id_str]
+        if run_id not in self._run_id_to_trace_id:
+            self._run_id_to_trace_id[run_id] = generate_trace_id()
+        return self._run_id_to_trace_id[run_id]
+
+    def _combined_metadata(
+        self,
+        metadata: Optional[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """Merge global metadata with per-call metadata.
+
+        One C-level dict construction instead of the copy-update-assign
+        sequence each start handler used to inline, with a shared empty
+        dict returned for the common no-metadata case so those events
+        allocate nothing. Tags are not folded in here — they go to the
+        dedicated traces.tags column.
+
+        Args:
+            metadata: Per-call metadata from LangChain
+
+        Returns:
+            Merged metadata dictionary
+        """
+        if not (self.global_metadata or metadata):
+            return _EMPTY_METADATA
+
+        combined = dict(self.global_metadata)
+        if metadata:
+            combined.update(metadata)
+        return combined
 
-    def _safe_execute(self, func, *args, **kwargs):
-        """Safely execute a function, catching and logging any errors.
+    def _resolve_span_times(self, run_id: UUID) -> tuple:
+        """Resolve (start_time, end_time) for a completing span.
+
+        Start times are wall-clock for storage and bucketing; the end
+        time is derived from the monotonic delta when the span's start
+        was observed, so duration_ms is immune to wall-clock steps and
+        costs no extra clock_gettime(CLOCK_REALTIME) call. Falls back
+        to a fresh wall read for spans whose start was never seen.
 
         Args:
-            func: Function to execute
-            *args: Positional arguments
-            **kwargs: Keyword arguments
+            run_id: LangChain run ID
+
+        Returns:
+            Tuple of (start_time, end_time) wall-clock timestamps
         """
-        try:
-            func(*args, **kwargs)
-        except Exception as e:
-            # Never break LLM execution due to callback errors
-            print(f"Observability callback error: {e}")
+        start_time = self._run_start_times.get(run_id)
+        perf_start = self._run_perf_starts.pop(run_id, None)
+
+        if start_time is not None and perf_start is not None:
+            return start_time, start_time + (time.perf_counter() - perf_start)
+
+        end_time = get_current_timestamp()
+        return (start_time if start_time is not None else end_time), end_time
+
+    def _flush_buffered_events(self, run_id: UUID):
+        """Write any events buffered under a completing run's scope.
+
+        Args:
+            run_id: Run whose buffered events should be flushed
+        """
+        rows = self._event_buffer.pop(run_id, None)
+        if rows:
+            self.event_repo.create_events(rows)
+
+    def _flush_pending_trace(self, trace_id: Optional[str]):
+        """Materialize a deferred trace row if something references it.
+
+        Child traces and events carry foreign keys to traces, so a
+        deferred row must hit disk before anything points at it. After
+        the flush the completion handler falls back to the UPDATE path.
+
+        Args:
+            trace_id: Trace ID to flush, or None (no-op)
+        """
+        if trace_id is not None:
+            pending = self._pending_traces.pop(trace_id, None)
+            if pending is not None:
+                self.trace_repo.create_trace(**pending)
 
     # LLM Callbacks
 
+    @_guarded
     def on_llm_start(
         self,
         serialized: Dict[str, Any],
@@ -112,53 +242,55 @@ class ObservabilityCallback(BaseCallbackHandler):
     ) -> None:
         """Called when LLM starts running."""
 
-        def _on_llm_start():
-            trace_id = self._get_or_create_trace_id(run_id)
-            start_time = get_current_timestamp()
-            self._run_start_times[str(run_id)] = start_time
-
-            # Get parent trace ID from context or parent run ID
-            parent_trace_id = (
-                self._get_or_create_trace_id(parent_run_id)
-                if parent_run_id
-                else self.context.get_current_trace_id()
-            )
-
-            # Get model name
-            model = serialized.get("name", serialized.get("id", ["unknown"])[-1])
-
-            # Combine metadata
-            combined_metadata = {**self.global_metadata}
-            if metadata:
-                combined_metadata.update(metadata)
-            if tags:
-                combined_metadata["tags"] = tags
-
-            # Create trace
-            self.trace_repo.create_trace(
-                trace_id=trace_id,
-                trace_type="llm",
-                name=f"llm_{model}",
-                start_time=start_time,
-                session_id=self.context.get_session_id(),
-                parent_trace_id=parent_trace_id,
-                metadata=combined_metadata,
-            )
-
-            # Push to context stack
-            self.context.push_trace(
-                trace_id=trace_id,
-                trace_type="llm",
-                name=f"llm_{model}",
-                start_time=start_time,
-                metadata=combined_metadata,
-            )
-
-        self._safe_execute(_on_llm_start)
-
+        trace_id = self._get_or_create_trace_id(run_id)
+        start_time = get_current_timestamp()
+        self._run_start_times[run_id] = start_time
+        self._run_perf_starts[run_id] = time.perf_counter()
+
+        # Get parent trace ID from context or parent run ID
+        parent_trace_id = (
+            self._get_or_create_trace_id(parent_run_id)
+            if parent_run_id
+            else self.context.get_current_trace_id()
+        )
+
+        # Get model name
+        model = serialized.get("name", serialized.get("id", ["unknown"])[-1])
+
+        # Combine metadata
+        combined_metadata = self._combined_metadata(metadata)
+        trace_name = f"llm_{model}"
+
+        # Parent row must exist on disk before this row points at it
+        self._flush_pending_trace(parent_trace_id)
+
+        # Defer the INSERT: LLM spans are leaves with no events, so
+        # the row is fused with the completion write in on_llm_end
+        self._pending_traces[trace_id] = dict(
+            trace_id=trace_id,
+            trace_type="llm",
+            name=trace_name,
+            start_time=start_time,
+            session_id=self.context.get_session_id(),
+            parent_trace_id=parent_trace_id,
+            metadata=combined_metadata,
+            tags=tags,
+        )
+
+        # Push to context stack
+        self.context.push_trace(
+            trace_id=trace_id,
+            trace_type="llm",
+            name=trace_name,
+            start_time=start_time,
+            metadata=combined_metadata,
+        )
+
+
+    @_guarded
     def on_llm_end(
         self,
-        response: LLMResult,
+        response: "LLMResult",
         *,
         run_id: UUID,
         parent_run_id: Optional[UUID] = None,
@@ -166,79 +298,132 @@ class ObservabilityCallback(BaseCallbackHandler):
     ) -> None:
         """Called when LLM completes."""
 
-        def _on_llm_end():
-            trace_id = self._get_or_create_trace_id(run_id)
-            end_time = get_current_timestamp()
-            start_time = self._run_start_times.get(str(run_id), end_time)
-
-            # Pop from context stack
-            self.context.pop_trace()
-
-            # Extract token usage and model info
-            llm_output = response.llm_output or {}
-            token_usage = llm_output.get("token_usage", {})
-
-            input_tokens = token_usage.get("prompt_tokens", 0)
-            output_tokens = token_usage.get("completion_tokens", 0)
-            total_tokens = token_usage.get("total_tokens", input_tokens + output_tokens)
-
-            model = llm_output.get("model_name", llm_output.get("model", "unknown"))
-
-            # Calculate cost
-            cost_usd = calculate_cost(model, input_tokens, output_tokens)
-
-            # Extract prompt and response
-            prompt = ""
-            system_prompt = None
-            response_text = ""
-
-            if response.generations and len(response.generations) > 0:
-                if len(response.generations[0]) > 0:
-                    response_text = response.generations[0][0].text
-
-            # Try to get prompt from kwargs or metadata
-            if hasattr(response, "prompts") and response.prompts:
-                prompt = response.prompts[0] if response.prompts else ""
-
-            # Truncate if needed
-            if ENABLE_PROMPT_LOGGING:
-                prompt = truncate_string(prompt, MAX_PROMPT_LENGTH)
-            else:
-                prompt = "[logging disabled]"
-
-            if ENABLE_RESPONSE_LOGGING:
-                response_text = truncate_string(response_text, MAX_RESPONSE_LENGTH)
-            else:
-                response_text = "[logging disabled]"
-
-            # Update trace with completion
+        trace_id = self._get_or_create_trace_id(run_id)
+        start_time, end_time = self._resolve_span_times(run_id)
+
+        # Pop from context stack
+        self.context.pop_trace()
+
+        # Extract token usage and model info
+        llm_output = response.llm_output or {}
+        token_usage = llm_output.get("token_usage", {})
+
+        input_tokens = token_usage.get("prompt_tokens", 0)
+        output_tokens = token_usage.get("completion_tokens", 0)
+        total_tokens = token_usage.get("total_tokens", input_tokens + output_tokens)
+
+        model = llm_output.get("model_name", llm_output.get("model", "unknown"))
+
+        # Calculate cost
+        cost_usd = calculate_cost(model, input_tokens, output_tokens)
+
+        # Extract prompt and response; pydantic attribute reads go
+        # through descriptors, so each is read once into a local
+        prompt = ""
+        system_prompt = None
+        response_text = ""
+
+        gens = response.generations
+        if gens and gens[0]:
+            response_text = gens[0][0].text
+
+        # Try to get prompt from kwargs or metadata
+        prompts = getattr(response, "prompts", None)
+        if prompts:
+            prompt = prompts[0]
+
+        # Truncate if needed
+        if ENABLE_PROMPT_LOGGING:
+            prompt = truncate_string(prompt, MAX_PROMPT_LENGTH)
+        else:
+            prompt = _DISABLED
+
+        if ENABLE_RESPONSE_LOGGING:
+            response_text = truncate_string(response_text, MAX_RESPONSE_LENGTH)
+        else:
+            response_text = _DISABLED
+
+        # Fused path: the row was deferred at start, so create and
+        # complete it in one INSERT carrying the denormalized LLM
+        # summary columns. Falls back to the UPDATE when the row was
+        # flushed early (a child or event referenced it on disk).
+        pending = self._pending_traces.pop(trace_id, None)
+        if pending is not None:
+            self.trace_repo.create_trace_complete(
+                end_time=end_time,
+                status="success",
+                model=model,
+                cost_usd=cost_usd,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                total_tokens=total_tokens,
+                **pending,
+            )
+        else:
             self.trace_repo.update_trace_completion(
                 trace_id=trace_id,
                 end_time=end_time,
                 start_time=start_time,
                 status="success",
-            )
-
-            # Create LLM call record
-            self.llm_repo.create_llm_call(
-                trace_id=trace_id,
                 model=model,
-                prompt=prompt,
-                response=response_text,
+                cost_usd=cost_usd,
                 input_tokens=input_tokens,
                 output_tokens=output_tokens,
                 total_tokens=total_tokens,
+            )
+
+        # Create LLM call record
+        self.llm_repo.create_llm_call(
+            trace_id=trace_id,
+            model=model,
+            prompt=prompt,
+            response=response_text,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=total_tokens,
+            cost_usd=cost_usd,
+            system_prompt=system_prompt,
+            provider="groq",
+        )
+
+        # Maintain the hourly rollup incrementally so dashboard
+        # aggregations can read one row per bucket instead of scanning
+        # raw llm_calls
+        self.metrics_repo.record_llm_call_rollup(
+            start_time=start_time,
+            model=model,
+            status="success",
+            cost_usd=cost_usd,
+            total_tokens=total_tokens,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            duration_ms=(end_time - start_time) * 1000,
+        )
+
+        # Latency rollup covers every trace type, so trend queries
+        # never re-scan raw traces
+        self.metrics_repo.record_trace_latency_rollup(
+            start_time=start_time,
+            trace_type="llm",
+            duration_ms=(end_time - start_time) * 1000,
+        )
+
+        # Same treatment per session: one upserted row per session
+        # keeps session cost breakdowns free of GROUP BY scans
+        session_id = self.context.get_session_id()
+        if session_id:
+            self.metrics_repo.record_session_rollup(
+                session_id=session_id,
+                start_time=start_time,
                 cost_usd=cost_usd,
-                system_prompt=system_prompt,
-                provider="groq",
             )
 
-            # Cleanup
-            del self._run_id_to_trace_id[str(run_id)]
-            del self._run_start_times[str(run_id)]
+        # Cleanup
+        self._run_id_to_trace_id.pop(run_id, None)
+        self._run_start_times.pop(run_id, None)
 
-        self._safe_execute(_on_llm_end)
 
+    @_guarded
     def on_llm_error(
         self,
         error: Union[Exception, KeyboardInterrupt],
@@ -249,15 +434,23 @@ class ObservabilityCallback(BaseCallbackHandler):
     ) -> None:
         """Called when LLM encounters an error."""
 
-        def _on_llm_error():
-            trace_id = self._get_or_create_trace_id(run_id)
-            end_time = get_current_timestamp()
-            start_time = self._run_start_times.get(str(run_id), end_time)
+        trace_id = self._get_or_create_trace_id(run_id)
+        start_time, end_time = self._resolve_span_times(run_id)
 
-            # Pop from context stack
-            self.context.pop_trace()
+        # Pop from context stack
+        self.context.pop_trace()
 
-            # Update trace with error
+        # Fused path when the row was deferred at start, UPDATE when
+        # it was already flushed to disk
+        pending = self._pending_traces.pop(trace_id, None)
+        if pending is not None:
+            self.trace_repo.create_trace_complete(
+                end_time=end_time,
+                status="error",
+                error_message=str(error),
+                **pending,
+            )
+        else:
             self.trace_repo.update_trace_completion(
                 trace_id=trace_id,
                 end_time=end_time,
@@ -266,16 +459,28 @@ class ObservabilityCallback(BaseCallbackHandler):
                 error_message=str(error),
             )
 
-            # Cleanup
-            if str(run_id) in self._run_id_to_trace_id:
-                del self._run_id_to_trace_id[str(run_id)]
-            if str(run_id) in self._run_start_times:
-                del self._run_start_times[str(run_id)]
+        # Record the failure in the hourly rollup
+        self.metrics_repo.record_llm_call_rollup(
+            start_time=start_time,
+            model="unknown",
+            status="error",
+            duration_ms=(end_time - start_time) * 1000,
+        )
+
+        self.metrics_repo.record_trace_latency_rollup(
+            start_time=start_time,
+            trace_type="llm",
+            duration_ms=(end_time - start_time) * 1000,
+        )
+
+        # Cleanup
+        self._run_id_to_trace_id.pop(run_id, None)
+        self._run_start_times.pop(run_id, None)
 
-        self._safe_execute(_on_llm_error)
 
     # Chain Callbacks
 
+    @_guarded
     def on_chain_start(
         self,
         serialized: Dict[str, Any],
@@ -289,49 +494,51 @@ class ObservabilityCallback(BaseCallbackHandler):
     ) -> None:
         """Called when chain starts running."""
 
-        def _on_chain_start():
-            trace_id = self._get_or_create_trace_id(run_id)
-            start_time = get_current_timestamp()
-            self._run_start_times[str(run_id)] = start_time
-
-            # Get parent trace ID
-            parent_trace_id = (
-                self._get_or_create_trace_id(parent_run_id)
-                if parent_run_id
-                else self.context.get_current_trace_id()
-            )
-
-            # Get chain name
-            chain_name = serialized.get("name", serialized.get("id", ["unknown"])[-1])
-
-            # Combine metadata
-            combined_metadata = {**self.global_metadata}
-            if metadata:
-                combined_metadata.update(metadata)
-            if tags:
-                combined_metadata["tags"] = tags
-
-            # Create trace
-            self.trace_repo.create_trace(
-                trace_id=trace_id,
-                trace_type="chain",
-                name=f"chain_{chain_name}",
-                start_time=start_time,
-                session_id=self.context.get_session_id(),
-                parent_trace_id=parent_trace_id,
-                metadata=combined_metadata,
-            )
-
-            # Push to context stack
-            self.context.push_trace(
-                trace_id=trace_id,
-                trace_type="chain",
-                name=f"chain_{chain_name}",
-                start_time=start_time,
-                metadata=combined_metadata,
-            )
-
-            # Log chain start event
+        trace_id = self._get_or_create_trace_id(run_id)
+        start_time = get_current_timestamp()
+        self._run_start_times[run_id] = start_time
+        self._run_perf_starts[run_id] = time.perf_counter()
+
+        # Get parent trace ID
+        parent_trace_id = (
+            self._get_or_create_trace_id(parent_run_id)
+            if parent_run_id
+            else self.context.get_current_trace_id()
+        )
+
+        # Get chain name
+        chain_name = serialized.get("name", serialized.get("id", ["unknown"])[-1])
+
+        # Combine metadata
+        combined_metadata = self._combined_metadata(metadata)
+        trace_name = f"chain_{chain_name}"
+
+        # Parent row must exist on disk before this row points at it
+        self._flush_pending_trace(parent_trace_id)
+
+        # Create trace
+        self.trace_repo.create_trace(
+            trace_id=trace_id,
+            trace_type="chain",
+            name=trace_name,
+            start_time=start_time,
+            session_id=self.context.get_session_id(),
+            parent_trace_id=parent_trace_id,
+            metadata=combined_metadata,
+            tags=tags,
+        )
+
+        # Push to context stack
+        self.context.push_trace(
+            trace_id=trace_id,
+            trace_type="chain",
+            name=trace_name,
+            start_time=start_time,
+            metadata=combined_metadata,
+        )
+
+        # Log chain start event
+        if self._events_enabled:
             self.event_repo.create_event(
                 trace_id=trace_id,
                 event_type="chain_start",
@@ -340,8 +547,8 @@ class ObservabilityCallback(BaseCallbackHandler):
                 data={"inputs": inputs} if ENABLE_PROMPT_LOGGING else {},
             )
 
-        self._safe_execute(_on_chain_start)
 
+    @_guarded
     def on_chain_end(
         self,
         outputs: Dict[str, Any],
@@ -352,23 +559,32 @@ class ObservabilityCallback(BaseCallbackHandler):
     ) -> None:
         """Called when chain completes."""
 
-        def _on_chain_end():
-            trace_id = self._get_or_create_trace_id(run_id)
-            end_time = get_current_timestamp()
-            start_time = self._run_start_times.get(str(run_id), end_time)
+        trace_id = self._get_or_create_trace_id(run_id)
+        start_time, end_time = self._resolve_span_times(run_id)
 
-            # Pop from context stack
-            self.context.pop_trace()
+        # Pop from context stack
+        self.context.pop_trace()
 
-            # Update trace with completion
-            self.trace_repo.update_trace_completion(
-                trace_id=trace_id,
-                end_time=end_time,
-                start_time=start_time,
-                status="success",
-            )
+        # Update trace with completion
+        self.trace_repo.update_trace_completion(
+            trace_id=trace_id,
+            end_time=end_time,
+            start_time=start_time,
+            status="success",
+        )
+
+        self.metrics_repo.record_trace_latency_rollup(
+            start_time=start_time,
+            trace_type="chain",
+            duration_ms=(end_time - start_time) * 1000,
+        )
 
-            # Log chain end event
+        # Write agent events buffered under this chain, then the chain
+        # end event, preserving emission order
+        self._flush_buffered_events(run_id)
+
+        # Log chain end event
+        if self._events_enabled:
             self.event_repo.create_event(
                 trace_id=trace_id,
                 event_type="chain_end",
@@ -377,14 +593,12 @@ class ObservabilityCallback(BaseCallbackHandler):
                 data={"outputs": outputs} if ENABLE_RESPONSE_LOGGING else {},
             )
 
-            # Cleanup
-            if str(run_id) in self._run_id_to_trace_id:
-                del self._run_id_to_trace_id[str(run_id)]
-            if str(run_id) in self._run_start_times:
-                del self._run_start_times[str(run_id)]
+        # Cleanup
+        self._run_id_to_trace_id.pop(run_id, None)
+        self._run_start_times.pop(run_id, None)
 
-        self._safe_execute(_on_chain_end)
 
+    @_guarded
     def on_chain_error(
         self,
         error: Union[Exception, KeyboardInterrupt],
@@ -395,33 +609,39 @@ class ObservabilityCallback(BaseCallbackHandler):
     ) -> None:
         """Called when chain encounters an error."""
 
-        def _on_chain_error():
-            trace_id = self._get_or_create_trace_id(run_id)
-            end_time = get_current_timestamp()
-            start_time = self._run_start_times.get(str(run_id), end_time)
+        trace_id = self._get_or_create_trace_id(run_id)
+        start_time, end_time = self._resolve_span_times(run_id)
 
-            # Pop from context stack
-            self.context.pop_trace()
+        # Pop from context stack
+        self.context.pop_trace()
 
-            # Update trace with error
-            self.trace_repo.update_trace_completion(
-                trace_id=trace_id,
-                end_time=end_time,
-                start_time=start_time,
-                status="error",
-                error_message=str(error),
-            )
+        # Update trace with error
+        self.trace_repo.update_trace_completion(
+            trace_id=trace_id,
+            end_time=end_time,
+            start_time=start_time,
+            status="error",
+            error_message=str(error),
+        )
+
+        self.metrics_repo.record_trace_latency_rollup(
+            start_time=start_time,
+            trace_type="chain",
+            duration_ms=(end_time - start_time) * 1000,
+        )
+
+        # Buffered agent events still describe work that happened
+        # before the failure
+        self._flush_buffered_events(run_id)
 
-            # Cleanup
-            if str(run_id) in self._run_id_to_trace_id:
-                del self._run_id_to_trace_id[str(run_id)]
-            if str(run_id) in self._run_start_times:
-                del self._run_start_times[str(run_id)]
+        # Cleanup
+        self._run_id_to_trace_id.pop(run_id, None)
+        self._run_start_times.pop(run_id, None)
 
-        self._safe_execute(_on_chain_error)
 
     # Tool Callbacks
 
+    @_guarded
     def on_tool_start(
         self,
         serialized: Dict[str, Any],
@@ -435,40 +655,42 @@ class ObservabilityCallback(BaseCallbackHandler):
     ) -> None:
         """Called when tool starts running."""
 
-        def _on_tool_start():
-            trace_id = self._get_or_create_trace_id(run_id)
-            start_time = get_current_timestamp()
-            self._run_start_times[str(run_id)] = start_time
-
-            # Get parent trace ID (usually from agent)
-            parent_trace_id = (
-                self._get_or_create_trace_id(parent_run_id)
-                if parent_run_id
-                else self.context.get_current_trace_id()
-            )
-
-            # Get tool name
-            tool_name = serialized.get("name", "unknown_tool")
-
-            # Combine metadata
-            combined_metadata = {**self.global_metadata}
-            if metadata:
-                combined_metadata.update(metadata)
-            if tags:
-                combined_metadata["tags"] = tags
-
-            # Create trace
-            self.trace_repo.create_trace(
-                trace_id=trace_id,
-                trace_type="tool",
-                name=f"tool_{tool_name}",
-                start_time=start_time,
-                session_id=self.context.get_session_id(),
-                parent_trace_id=parent_trace_id,
-                metadata=combined_metadata,
-            )
-
-            # Log tool start event
+        trace_id = self._get_or_create_trace_id(run_id)
+        start_time = get_current_timestamp()
+        self._run_start_times[run_id] = start_time
+        self._run_perf_starts[run_id] = time.perf_counter()
+
+        # Get parent trace ID (usually from agent)
+        parent_trace_id = (
+            self._get_or_create_trace_id(parent_run_id)
+            if parent_run_id
+            else self.context.get_current_trace_id()
+        )
+
+        # Get tool name
+        tool_name = serialized.get("name", "unknown_tool")
+
+        # Combine metadata
+        combined_metadata = self._combined_metadata(metadata)
+        trace_name = f"tool_{tool_name}"
+
+        # Parent row must exist on disk before this row points at it
+        self._flush_pending_trace(parent_trace_id)
+
+        # Create trace
+        self.trace_repo.create_trace(
+            trace_id=trace_id,
+            trace_type="tool",
+            name=trace_name,
+            start_time=start_time,
+            session_id=self.context.get_session_id(),
+            parent_trace_id=parent_trace_id,
+            metadata=combined_metadata,
+            tags=tags,
+        )
+
+        # Log tool start event
+        if self._events_enabled:
             self.event_repo.create_event(
                 trace_id=trace_id,
                 event_type="tool_start",
@@ -477,8 +699,8 @@ class ObservabilityCallback(BaseCallbackHandler):
                 data={"input": input_str} if ENABLE_PROMPT_LOGGING else {},
             )
 
-        self._safe_execute(_on_tool_start)
 
+    @_guarded
     def on_tool_end(
         self,
         output: str,
@@ -489,20 +711,25 @@ class ObservabilityCallback(BaseCallbackHandler):
     ) -> None:
         """Called when tool completes."""
 
-        def _on_tool_end():
-            trace_id = self._get_or_create_trace_id(run_id)
-            end_time = get_current_timestamp()
-            start_time = self._run_start_times.get(str(run_id), end_time)
-
-            # Update trace with completion
-            self.trace_repo.update_trace_completion(
-                trace_id=trace_id,
-                end_time=end_time,
-                start_time=start_time,
-                status="success",
-            )
-
-            # Log tool end event
+        trace_id = self._get_or_create_trace_id(run_id)
+        start_time, end_time = self._resolve_span_times(run_id)
+
+        # Update trace with completion
+        self.trace_repo.update_trace_completion(
+            trace_id=trace_id,
+            end_time=end_time,
+            start_time=start_time,
+            status="success",
+        )
+
+        self.metrics_repo.record_trace_latency_rollup(
+            start_time=start_time,
+            trace_type="tool",
+            duration_ms=(end_time - start_time) * 1000,
+        )
+
+        # Log tool end event
+        if self._events_enabled:
             self.event_repo.create_event(
                 trace_id=trace_id,
                 event_type="tool_end",
@@ -511,14 +738,12 @@ class ObservabilityCallback(BaseCallbackHandler):
                 data={"output": output} if ENABLE_RESPONSE_LOGGING else {},
             )
 
-            # Cleanup
-            if str(run_id) in self._run_id_to_trace_id:
-                del self._run_id_to_trace_id[str(run_id)]
-            if str(run_id) in self._run_start_times:
-                del self._run_start_times[str(run_id)]
+        # Cleanup
+        self._run_id_to_trace_id.pop(run_id, None)
+        self._run_start_times.pop(run_id, None)
 
-        self._safe_execute(_on_tool_end)
 
+    @_guarded
     def on_tool_error(
         self,
         error: Union[Exception, KeyboardInterrupt],
@@ -529,33 +754,35 @@ class ObservabilityCallback(BaseCallbackHandler):
     ) -> None:
         """Called when tool encounters an error."""
 
-        def _on_tool_error():
-            trace_id = self._get_or_create_trace_id(run_id)
-            end_time = get_current_timestamp()
-            start_time = self._run_start_times.get(str(run_id), end_time)
+        trace_id = self._get_or_create_trace_id(run_id)
+        start_time, end_time = self._resolve_span_times(run_id)
 
-            # Update trace with error
-            self.trace_repo.update_trace_completion(
-                trace_id=trace_id,
-                end_time=end_time,
-                start_time=start_time,
-                status="error",
-                error_message=str(error),
-            )
+        # Update trace with error
+        self.trace_repo.update_trace_completion(
+            trace_id=trace_id,
+            end_time=end_time,
+            start_time=start_time,
+            status="error",
+            error_message=str(error),
+        )
+
+        self.metrics_repo.record_trace_latency_rollup(
+            start_time=start_time,
+            trace_type="tool",
+            duration_ms=(end_time - start_time) * 1000,
+        )
 
-            # Cleanup
-            if str(run_id) in self._run_id_to_trace_id:
-                del self._run_id_to_trace_id[str(run_id)]
-            if str(run_id) in self._run_start_times:
-                del self._run_start_times[str(run_id)]
+        # Cleanup
+        self._run_id_to_trace_id.pop(run_id, None)
+        self._run_start_times.pop(run_id, None)
 
-        self._safe_execute(_on_tool_error)
 
     # Agent Callbacks
 
+    @_guarded
     def on_agent_action(
         self,
-        action: AgentAction,
+        action: "AgentAction",
         *,
         run_id: UUID,
         parent_run_id: Optional[UUID] = None,
@@ -563,34 +790,44 @@ class ObservabilityCallback(BaseCallbackHandler):
     ) -> None:
         """Called when agent takes an action."""
 
-        def _on_agent_action():
-            # Log agent action as an event under the current trace
-            current_trace_id = (
-                self._get_or_create_trace_id(parent_run_id)
-                if parent_run_id
-                else self.context.get_current_trace_id()
-            )
+        # The handler only emits an event, so bail before resolving
+        # the trace when event logging is off
+        if not self._events_enabled:
+            return
+
+        # Log agent action as an event under the current trace
+        current_trace_id = (
+            self._get_or_create_trace_id(parent_run_id)
+            if parent_run_id
+            else self.context.get_current_trace_id()
+        )
+
+        if current_trace_id:
+            self._flush_pending_trace(current_trace_id)
+            event = {
+                "trace_id": current_trace_id,
+                "event_type": "agent_action",
+                "event_name": action.tool,
+                "timestamp": get_current_timestamp(),
+                "data": {
+                    "tool": action.tool,
+                    "tool_input": action.tool_input,
+                    "log": action.log,
+                }
+                if ENABLE_PROMPT_LOGGING
+                else {},
+            }
+            if parent_run_id is not None:
+                # Defer to the parent chain's completion flush
+                self._event_buffer.setdefault(parent_run_id, []).append(event)
+            else:
+                self.event_repo.create_events([event])
 
-            if current_trace_id:
-                self.event_repo.create_event(
-                    trace_id=current_trace_id,
-                    event_type="agent_action",
-                    event_name=action.tool,
-                    timestamp=get_current_timestamp(),
-                    data={
-                        "tool": action.tool,
-                        "tool_input": action.tool_input,
-                        "log": action.log,
-                    }
-                    if ENABLE_PROMPT_LOGGING
-                    else {},
-                )
-
-        self._safe_execute(_on_agent_action)
 
+    @_guarded
     def on_agent_finish(
         self,
-        finish: AgentFinish,
+        finish: "AgentFinish",
         *,
         run_id: UUID,
         parent_run_id: Optional[UUID] = None,
@@ -598,23 +835,29 @@ class ObservabilityCallback(BaseCallbackHandler):
     ) -> None:
         """Called when agent finishes."""
 
-        def _on_agent_finish():
-            # Log agent finish as an event under the current trace
-            current_trace_id = (
-                self._get_or_create_trace_id(parent_run_id)
-                if parent_run_id
-                else self.context.get_current_trace_id()
-            )
+        if not self._events_enabled:
+            return
+
+        # Log agent finish as an event under the current trace
+        current_trace_id = (
+            self._get_or_create_trace_id(parent_run_id)
+            if parent_run_id
+            else self.context.get_current_trace_id()
+        )
+
+        if current_trace_id:
+            self._flush_pending_trace(current_trace_id)
+            event = {
+                "trace_id": current_trace_id,
+                "event_type": "agent_finish",
+                "event_name": "agent_completed",
+                "timestamp": get_current_timestamp(),
+                "data": {"return_values": finish.return_values, "log": finish.log}
+                if ENABLE_RESPONSE_LOGGING
+                else {},
+            }
+            if parent_run_id is not None:
+                self._event_buffer.setdefault(parent_run_id, []).append(event)
+            else:
+                self.event_repo.create_events([event])
 
-            if current_trace_id:
-                self.event_repo.create_event(
-                    trace_id=current_trace_id,
-                    event_type="agent_finish",
-                    event_name="agent_completed",
-                    timestamp=get_current_timestamp(),
-                    data={"return_values": finish.return_values, "log": finish.log}
-                    if ENABLE_RESPONSE_LOGGING
-                    else {},
-                )
-
-        self._safe_execute(_on_agent_finish)
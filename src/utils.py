@@ -1,11 +1,35 @@
 """Utility functions for AI Observability Toolkit."""
 
+import functools
 import json
+import os
 import time
-import uuid
 from datetime import datetime
 from typing import Any, Dict, Optional
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def _random_uuid4_str() -> str:
+    """Format 16 random bytes as a canonical UUID4 string.
+
+    Skips uuid.UUID's Python-level validation and int round-trips —
+    every span pays for one of these, and the result is only ever used
+    as an opaque TEXT key. The version and variant bits are still set
+    so the output is a well-formed UUID4.
+
+    Returns:
+        A UUID4-formatted random string
+    """
+    b = bytearray(os.urandom(16))
+    b[6] = (b[6] & 0x0F) | 0x40
+    b[8] = (b[8] & 0x3F) | 0x80
+    h = bytes(b).hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
 
 def generate_trace_id() -> str:
     """Generate a unique trace ID using UUID4.
@@ -13,7 +37,7 @@ def generate_trace_id() -> str:
     Returns:
         A unique trace ID string
     """
-    return str(uuid.uuid4())
+    return _random_uuid4_str()
 
 
 def generate_session_id() -> str:
@@ -22,7 +46,7 @@ def generate_session_id() -> str:
     Returns:
         A unique session ID string
     """
-    return str(uuid.uuid4())
+    return _random_uuid4_str()
 
 
 def get_current_timestamp() -> float:
@@ -34,6 +58,91 @@ def get_current_timestamp() -> float:
     return time.time()
 
 
+@functools.lru_cache(maxsize=256)
+def compile_query(base: str, *clauses: str) -> str:
+    """Assemble a SQL string from a base query plus optional clauses.
+
+    Tracker methods build their SQL from a fixed base and a small set of
+    filter fragments; memoizing on the fragment tuple means each filter
+    shape is concatenated once per process and the identical string
+    object is handed to SQLite every call, keeping its prepared-statement
+    cache hot.
+
+    Args:
+        base: Base SQL string
+        *clauses: Clause fragments appended in order
+
+    Returns:
+        The assembled SQL string
+    """
+    return base + "".join(clauses)
+
+
+def ttl_cache(ttl: float = 60.0, maxsize: int = 128):
+    """Decorator caching read-only tracker methods for a short period.
+
+    Entries are keyed on the method arguments plus the database write
+    generation, so any insert or update invalidates the cache
+    immediately; the TTL additionally bounds staleness for hours-based
+    windows that slide with the clock.
+
+    Args:
+        ttl: Maximum age of a cached result in seconds
+        maxsize: Cache is cleared wholesale once it reaches this size
+
+    Returns:
+        Decorator for methods of classes exposing a `db` attribute
+    """
+
+    def decorator(func):
+        cache: Dict[tuple, tuple] = {}
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            key = (
+                id(self),
+                args,
+                tuple(sorted(kwargs.items())),
+                getattr(self.db, "write_generation", 0),
+            )
+            now = time.time()
+            hit = cache.get(key)
+            if hit is not None and now - hit[0] < ttl:
+                return hit[1]
+
+            value = func(self, *args, **kwargs)
+            if len(cache) >= maxsize:
+                cache.clear()
+            cache[key] = (now, value)
+            return value
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+
+    return decorator
+
+
+def resolve_time_window(
+    start_time: Optional[float],
+    end_time: Optional[float],
+    hours: Optional[int],
+) -> tuple:
+    """Resolve an hours-back shortcut into explicit timestamps.
+
+    Args:
+        start_time: Start timestamp (optional)
+        end_time: End timestamp (optional)
+        hours: Number of hours back from now; overrides start/end if given
+
+    Returns:
+        Tuple of (start_time, end_time)
+    """
+    if hours:
+        end_time = time.time()
+        start_time = end_time - (hours * 3600)
+    return start_time, end_time
+
+
 def timestamp_to_datetime(timestamp: float) -> datetime:
     """Convert Unix timestamp to datetime object.
 
@@ -74,6 +183,10 @@ def calculate_duration_ms(start_time: float, end_time: float) -> float:
 def serialize_to_json(data: Any) -> str:
     """Serialize data to JSON string with error handling.
 
+    Uses orjson's native-code serializer when it is installed — metadata
+    serialization sits on the trace write path — falling back to the
+    stdlib otherwise.
+
     Args:
         data: Data to serialize
 
@@ -81,6 +194,12 @@ def serialize_to_json(data: Any) -> str:
         JSON string, or empty string if serialization fails
     """
     try:
+        if orjson is not None:
+            # OPT_NON_STR_KEYS matches stdlib behavior of coercing
+            # int/float dict keys instead of raising
+            return orjson.dumps(
+                data, default=str, option=orjson.OPT_NON_STR_KEYS
+            ).decode()
         return json.dumps(data, default=str, ensure_ascii=False)
     except Exception:
         return "{}"
@@ -89,6 +208,9 @@ def serialize_to_json(data: Any) -> str:
 def deserialize_from_json(json_str: str) -> Dict[str, Any]:
     """Deserialize JSON string to dictionary with error handling.
 
+    Mirrors serialize_to_json: orjson's native-code parser when
+    installed, stdlib otherwise.
+
     Args:
         json_str: JSON string to deserialize
 
@@ -96,7 +218,11 @@ def deserialize_from_json(json_str: str) -> Dict[str, Any]:
         Dictionary, or empty dict if deserialization fails
     """
     try:
-        return json.loads(json_str) if json_str else {}
+        if not json_str:
+            return {}
+        if orjson is not None:
+            return orjson.loads(json_str)
+        return json.loads(json_str)
     except Exception:
         return {}
 
@@ -113,6 +239,10 @@ def truncate_string(text: str, max_length: int) -> str:
     """
     if len(text) <= max_length:
         return text
+    # Degenerate limits would otherwise slice from the wrong end and
+    # return more than max_length characters
+    if max_length <= 3:
+        return "." * max_length
     return text[: max_length - 3] + "..."
 
 
@@ -132,9 +262,35 @@ def sanitize_text(text: str, mask_patterns: Optional[list] = None) -> str:
     return text
 
 
+@functools.lru_cache(maxsize=256)
+def _format_bucket_cached(window: int, bucket_type: str) -> str:
+    """Format one quantized window into its bucket string.
+
+    Quantization is on 15-minute boundaries: every UTC offset is a
+    multiple of 15 minutes, so the hourly and daily labels (which use
+    local time) are constant within each window in any timezone.
+
+    Args:
+        window: Timestamp quantized to a 15-minute window (ts // 900)
+        bucket_type: Type of bucket ('hourly', 'daily')
+
+    Returns:
+        Time bucket string
+    """
+    dt = timestamp_to_datetime(window * 900)
+
+    if bucket_type == "daily":
+        return dt.strftime("%Y-%m-%d")
+    return dt.strftime("%Y-%m-%d-%H")
+
+
 def format_time_bucket(timestamp: float, bucket_type: str = "hourly") -> str:
     """Format timestamp into a time bucket string for aggregation.
 
+    The strftime work is memoized per 15-minute window, so repeated
+    calls inside the same bucket — every rollup write and rollup-path
+    read — reuse one cached string instead of re-running strftime.
+
     Args:
         timestamp: Unix timestamp
         bucket_type: Type of bucket ('hourly', 'daily')
@@ -142,14 +298,7 @@ def format_time_bucket(timestamp: float, bucket_type: str = "hourly") -> str:
     Returns:
         Time bucket string (e.g., '2026-01-13-14' for hourly)
     """
-    dt = timestamp_to_datetime(timestamp)
-
-    if bucket_type == "hourly":
-        return dt.strftime("%Y-%m-%d-%H")
-    elif bucket_type == "daily":
-        return dt.strftime("%Y-%m-%d")
-    else:
-        return dt.strftime("%Y-%m-%d-%H")
+    return _format_bucket_cached(int(timestamp // 900), bucket_type)
 
 
 def safe_divide(numerator: float, denominator: float, default: float = 0.0) -> float: